@@ -0,0 +1,52 @@
+"""
+Compare exporting a multiband stack band by band against the single
+dataset-level write used by pyrsgis.raster.export.
+
+Usage: python benchmarks/bench_export.py [n_bands] [rows] [cols]
+"""
+
+import os, sys, time, tempfile
+import numpy as np
+from osgeo import gdal
+from pyrsgis import raster
+
+def per_band_export(arr, ds, filename):
+    driver = gdal.GetDriverByName('GTiff')
+    outdata = driver.Create(filename, arr.shape[2], arr.shape[1], arr.shape[0], gdal.GDT_Float32)
+    outdata.SetGeoTransform(ds.GeoTransform)
+    outdata.SetProjection(ds.Projection)
+    for n in range(arr.shape[0]):
+        outdata.GetRasterBand(n + 1).WriteArray(arr[n, :, :])
+    outdata.FlushCache()
+    outdata = None
+
+def timed(func, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return(best)
+
+if __name__ == '__main__':
+    n_bands, rows, cols = [int(item) for item in (sys.argv[1:] + ['12', '2048', '2048'][len(sys.argv[1:]):])]
+    arr = np.random.random((n_bands, rows, cols)).astype(np.float32)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        driver = gdal.GetDriverByName('GTiff')
+        reference = os.path.join(tmp, 'reference.tif')
+        ref = driver.Create(reference, cols, rows, 1, gdal.GDT_Byte)
+        ref.SetGeoTransform((0, 30, 0, rows * 30, 0, -30))
+        ref = None
+        ds, _ = raster.read(reference)
+
+        outfile = os.path.join(tmp, 'out.tif')
+        t_band = timed(per_band_export, arr, ds, outfile)
+        t_all = timed(raster.export, arr, ds, outfile, 'float32')
+        t_sub = timed(raster.export, arr, ds, outfile, 'float32', list(range(1, n_bands, 2)))
+
+    print('Stack of %d bands, %d x %d cells' % (n_bands, rows, cols))
+    print('Band by band write   : %.3f s' % t_band)
+    print('Single dataset write : %.3f s (%.2fx)' % (t_all, t_band / t_all))
+    print('Every second band    : %.3f s' % t_sub)
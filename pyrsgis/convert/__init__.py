@@ -5,6 +5,10 @@ import numpy as np
 import pandas as pd
 import csv
 from ..raster import read
+from ..raster import read_meta
+from ..raster import archive_members
+from ..raster import _archive_prefix
+from ..raster import _member_path
 from ..raster import export
 from .. import doc_address
 
@@ -136,7 +140,23 @@ def table_to_array(table, n_rows=None, n_cols=None):
     return out_arr
 
 
-def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remove=[], badrows=True):
+def _rasters_to_columns(data_df, files):
+    # add the bands of each raster file as columns named file@band
+    for file in files:
+        print('Converting %s..' % (file))
+        header = os.path.basename(file)
+
+        ds, arr = read(file)
+        n_bands = ds.RasterCount
+
+        if n_bands > 1:
+            for n in range(0, n_bands):
+                data_df['%s@%d' % (header, n+1)] = np.ravel(arr[n, :, :])
+        else:
+            data_df['%s@%d' % (header, 1)] = np.ravel(arr)
+
+
+def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remove=[], badrows=True, member=None):
     """
     Convert raster to a tabular CSV file
 
@@ -147,7 +167,9 @@ def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remov
     Parameters
     ----------
     path       : string
-                 Path to a file or a directory containing raster file(s).
+                 Path to a file or a directory containing raster file(s). This can
+                 also be a .zip, .tar, .tar.gz or .tgz archive, in which case the
+                 GeoTIFFs inside the archive are read without extracting it.
                  
     filename   : string
                  Output CSV file name, with or without path.
@@ -171,6 +193,10 @@ def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remov
                  reducing the size of the data. Please note that cells converted to zero by
                  passing the 'negative' and 'remove' arguments will also be considered as bad cells.
 
+    member     : string, optional
+                 If ``path`` is an archive, the path of the raster inside it to convert.
+                 If not given, all the GeoTIFFs in the archive are converted.
+
     Examples
     --------
     >>> from pyrsgis import convert
@@ -201,13 +227,27 @@ def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remov
 
     >>> convert.raster_to_csv(input_dir, filename=output_file, badrows=False)
 
+    Scene bundles need not be extracted first:
+
+    >>> convert.raster_to_csv(r'E:/path_to_your_file/scene.tar', filename=output_file)
+    >>> convert.raster_to_csv(r'E:/path_to_your_file/scene.zip', filename=output_file, member='B4.TIF')
+
     """
     
     data_df = pd.DataFrame()
     names = []
 
+    # If an archive is provided
+    if _archive_prefix(path) is not None:
+        if member is None:
+            members = [item for item in archive_members(path) if item.lower().endswith(('.tif', '.tiff'))]
+        else:
+            members = [member]
+
+        _rasters_to_columns(data_df, [_member_path(path, item) for item in members])
+
     # If an input file is provided
-    if os.path.splitext(path)[-1].lower()[-3:] == 'tif':
+    elif os.path.splitext(path)[-1].lower()[-3:] == 'tif':
         ds, arr = read(path)
         header = os.path.splitext(os.path.basename(path))[0]
 
@@ -220,19 +260,7 @@ def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remov
     # If a directory is provided
     else:
         os.chdir(path)
-
-        for file in glob.glob("*.tif"):
-            print('Converting %s..' % (file))
-            header = os.path.basename(file)
-            
-            ds, arr = read(file)
-            n_bands = ds.RasterCount
-
-            if n_bands > 1:
-                for n in range(0, n_bands):
-                    data_df['%s@%d' % (header, n+1)] = np.ravel(arr[n, :, :])
-            else:
-                data_df['%s@%d' % (header, 1)] = np.ravel(arr)
+        _rasters_to_columns(data_df, glob.glob("*.tif"))
 
     # Based on passed arguments, check for negatives and values to be removed
     if negative==False:
@@ -250,7 +278,7 @@ def raster_to_csv(path, filename='pyrsgis_rastertocsv.csv', negative=True, remov
 
 
 def csv_to_raster(csvfile, ref_raster, cols=[], stacked=True, filename=None,
-                  dtype='default', compress=None, nodata=-9999):
+                  dtype='default', compress=None, nodata=-9999, ref_member=None):
     """
     Convert a CSV file to raster
 
@@ -288,6 +316,10 @@ def csv_to_raster(csvfile, ref_raster, cols=[], stacked=True, filename=None,
     nodata        : signed number
                     Value to treat as NoData in the out out raster.
 
+    ref_member    : string, optional
+                    If ``ref_raster`` is a zip or tar archive, the path of the reference
+                    raster inside the archive.
+
     Examples
     --------
     Let's assume that you convert a GeoTIFF file to CSV and perform some statistical analysis.
@@ -322,8 +354,7 @@ def csv_to_raster(csvfile, ref_raster, cols=[], stacked=True, filename=None,
     if filename == None:
         filename = csvfile.replace('.csv', '.tif')
 
-    ds, _ = read(ref_raster, bands=1)
-    _ = None
+    ds = read_meta(ref_raster, member=ref_member)
     x_size, y_size = ds.RasterYSize, ds.RasterXSize
 
     data_df = pd.read_csv(csvfile)
@@ -1,16 +1,18 @@
 #pyrsgis/raster
 
-import os, math
+import io, os, json, math, queue, threading, time, uuid, weakref
 import numpy as np
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 from .. import doc_address
 from copy import deepcopy
 from .. import utils
 
 # safely import gdal (support old version)
 try:
-    from osgeo import gdal
+    from osgeo import gdal, osr
 except:
-    import gdal
+    import gdal, osr
 
 
 class _create_ds():
@@ -53,23 +55,483 @@ class _create_ds():
 
         self.bbox = tuple([[self.ul_lon, self.lr_lat], [self.lr_lon, self.ul_lat]])
 
-def _extract_bands(ds, bands):
-    if ds.RasterCount > 1:
-        layer, row, col = ds.RasterCount, ds.RasterYSize, ds.RasterXSize
-        if (type(bands) == type(list())) or (type(bands) == type(tuple())):
-            array = np.random.randint(1, size=(len(bands), row, col))
-            for n, index in enumerate(bands):
-                tempArray = ds.GetRasterBand(index)
-                array[n, :, :] = tempArray.ReadAsArray()
-            if array.shape[0] == 1:
-                array = np.reshape(array, (row, col))
-        elif type(bands) == type(1):
-            array = ds.GetRasterBand(bands).ReadAsArray()
+class _ThreadDatasets():
+    # the open datasets of one thread, held in an object that can be weakly referenced
+    def __init__(self):
+        self.datasets = OrderedDict()
+
+class _DatasetCache():
+    """
+    A bounded LRU cache of open GDAL datasets. Entries are keyed by the
+    absolute path, modification time and size of the file, so a file that
+    is rewritten on the disk is opened again. GDAL handles must not be
+    shared between threads, hence every thread keeps its own cache in
+    thread-local storage. The cache of a thread is dropped, and its handles
+    closed, when the thread exits, so the short-lived threads of the worker
+    pools never take the slots of the calling thread.
+    """
+
+    def __init__(self, maxsize=8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._caches = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def _datasets(self):
+        thread_datasets = getattr(self._local, 'thread_datasets', None)
+        if thread_datasets is None:
+            thread_datasets = self._local.thread_datasets = _ThreadDatasets()
+            with self._lock:
+                self._caches.add(thread_datasets)
+        return(thread_datasets.datasets)
+
+    def open(self, file):
+        # only regular files on the disk can be cached safely
+        try:
+            path = os.path.abspath(file)
+            stat = os.stat(path)
+        except (TypeError, ValueError, OSError):
+            return(gdal.Open(file))
+
+        datasets = self._datasets()
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in datasets:
+                datasets.move_to_end(key)
+                self.hits += 1
+                return(datasets[key])
+            self.misses += 1
+
+        ds = gdal.Open(file)
+        if (ds is None) or (self.maxsize <= 0):
+            return(ds)
+
+        with self._lock:
+            # drop the handles of older versions of the same file
+            for old_key in [item for item in datasets if item[0] == path]:
+                del datasets[old_key]
+            datasets[key] = ds
+            while len(datasets) > self.maxsize:
+                datasets.popitem(last=False)
+
+        return(ds)
+
+    def clear(self, file=None):
+        # the handles of every thread are released, not only those of the caller
+        with self._lock:
+            for datasets in [item.datasets for item in self._caches]:
+                if file is None:
+                    datasets.clear()
+                else:
+                    path = os.path.abspath(file)
+                    for key in [item for item in datasets if item[0] == path]:
+                        del datasets[key]
+            if file is None:
+                self.hits, self.misses = 0, 0
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            for datasets in [item.datasets for item in self._caches]:
+                while len(datasets) > max(maxsize, 0):
+                    datasets.popitem(last=False)
+
+    def info(self):
+        datasets = self._datasets()
+        with self._lock:
+            return({'hits': self.hits, 'misses': self.misses,
+                    'maxsize': self.maxsize, 'currsize': len(datasets)})
+
+_dataset_cache = _DatasetCache()
+
+def _open(file):
+    return(_dataset_cache.open(file))
+
+def cache_info():
+    """
+    Statistics of the dataset cache
+
+    Opening a raster file with GDAL has a cost, which adds up when the same file is read
+    many times (band by band, window by window, etc.). Therefore, the reading functions
+    of pyrsgis keep the recently opened files in a small cache. Every thread has its own
+    cache, which is dropped when the thread exits. This function returns the number of
+    cache hits and misses of all the threads, the maximum number of cached files per
+    thread and the number of files currently in the cache of the calling thread.
+
+    Returns
+    -------
+    info            : dictionary
+                      A dictionary with the 'hits', 'misses', 'maxsize' and 'currsize' keys.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> input_file = r'E:/path_to_your_file/raster_file.tif'
+    >>> for band in range(1, 7):
+    ...     ds, arr = raster.read(input_file, bands=band)
+    >>> print(raster.cache_info())
+    {'hits': 5, 'misses': 1, 'maxsize': 8, 'currsize': 1}
+
+    """
+
+    return(_dataset_cache.info())
+
+def clear_cache(file=None):
+    """
+    Clear the dataset cache
+
+    Close the cached GDAL datasets, either all of them or only those of the given file.
+    Clearing all the datasets also resets the hit and miss counters. Files that are modified
+    on the disk are automatically opened again, hence this is mainly useful to release
+    the file handles (for example, before deleting a file on Windows).
+
+    Parameters
+    ----------
+    file            : string, optional
+                      Path to the file to remove from the cache. If not given, the whole
+                      cache is cleared.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> raster.clear_cache(r'E:/path_to_your_file/raster_file.tif')
+
+    """
+
+    _dataset_cache.clear(file)
+
+def set_cache_size(maxsize):
+    """
+    Set the size of the dataset cache
+
+    Parameters
+    ----------
+    maxsize         : integer
+                      The maximum number of open datasets to keep in each thread. The least
+                      recently used datasets are closed first. Pass 0 to disable the cache.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> raster.set_cache_size(32)
+
+    """
+
+    _dataset_cache.resize(int(maxsize))
+
+def _window_from_bbox(ds, bbox):
+    """
+    Convert a bounding box in the form [[x_min, y_min], [x_max, y_max]] to
+    a pixel window (xoff, yoff, xsize, ysize). Only the cells that fall
+    completely inside the bounding box are included in the window.
+    """
+    [x_min, y_min], [x_max, y_max] = bbox
+    ul_lon, cell_xsize, _, ul_lat, _, cell_ysize = ds.GetGeoTransform()
+
+    # position of the bbox edges in (fractional) cell units, a small
+    # tolerance avoids dropping cells because of floating point noise
+    eps = 1e-6
+    col_edges = sorted([(x_min - ul_lon) / cell_xsize, (x_max - ul_lon) / cell_xsize])
+    row_edges = sorted([(y_min - ul_lat) / cell_ysize, (y_max - ul_lat) / cell_ysize])
+
+    col_min = max(int(math.ceil(col_edges[0] - eps)), 0)
+    col_max = min(int(math.floor(col_edges[1] + eps)), ds.RasterXSize)
+    row_min = max(int(math.ceil(row_edges[0] - eps)), 0)
+    row_max = min(int(math.floor(row_edges[1] + eps)), ds.RasterYSize)
+
+    return(col_min, row_min, col_max - col_min, row_max - row_min)
+
+def _valid_window(ds, window):
+    xoff, yoff, xsize, ysize = window
+    return((xoff >= 0) and (yoff >= 0) and (xsize > 0) and (ysize > 0) and\
+           (xoff + xsize <= ds.RasterXSize) and (yoff + ysize <= ds.RasterYSize))
+
+def _window_ds(ds, window):
+    """
+    Return a copy of the datasource object whose geotransform and size
+    describe the given pixel window (xoff, yoff, xsize, ysize).
+    """
+    xoff, yoff, xsize, ysize = window
+    geo_transform = list(ds.GeoTransform)
+    geo_transform[0] += xoff * geo_transform[1] + yoff * geo_transform[2]
+    geo_transform[3] += xoff * geo_transform[4] + yoff * geo_transform[5]
+
+    out_ds = deepcopy(ds)
+    out_ds.GeoTransform = tuple(geo_transform)
+    out_ds.RasterXSize, out_ds.RasterYSize = int(xsize), int(ysize)
+    out_ds.update_bbox()
+
+    return(out_ds)
+
+def _bands_dtype(ds, band_list):
+    # smallest numpy type that can hold the cells of all the given bands
+    return(np.result_type(*[utils.datatype_dict_num_np[ds.GetRasterBand(index).DataType] for index in band_list]))
+
+def _scale_ds(ds, buf_shape):
+    """
+    Return a copy of the datasource object resampled to the given
+    (rows, cols), keeping the extent of the raster.
+    """
+    row, col = buf_shape
+    x_factor, y_factor = ds.RasterXSize / col, ds.RasterYSize / row
+    geo_transform = list(ds.GeoTransform)
+    geo_transform[1] *= x_factor
+    geo_transform[2] *= y_factor
+    geo_transform[4] *= x_factor
+    geo_transform[5] *= y_factor
+
+    out_ds = deepcopy(ds)
+    out_ds.GeoTransform = tuple(geo_transform)
+    out_ds.RasterXSize, out_ds.RasterYSize = int(col), int(row)
+    out_ds.update_bbox()
+
+    return(out_ds)
+
+def _band_list(ds, bands):
+    if type(bands) == type('all'):
+        return(list(range(1, ds.RasterCount + 1)))
+    elif type(bands) == type(1):
+        return([bands])
+    else:
+        return([int(item) for item in bands])
+
+def _extract_bands(ds, bands, window=None, out=None, file=None, workers=1, buf_shape=None, resampling='nearest'):
+    # GDAL takes the window as xoff, yoff, xsize, ysize positional arguments
+    if window is None:
+        window = ()
+        row, col = ds.RasterYSize, ds.RasterXSize
     else:
-        array = ds.ReadAsArray()
-    return(array)
+        window = tuple(int(item) for item in window)
+        row, col = window[3], window[2]
+
+    # reading into a smaller buffer lets GDAL serve the cells from the overviews
+    read_kwargs = {}
+    if buf_shape is not None:
+        row, col = [int(item) for item in buf_shape]
+        read_kwargs = {'buf_xsize': col, 'buf_ysize': row,
+                       'resample_alg': raster_resampling[resampling.lower()]}
+
+    band_list = _band_list(ds, bands)
+
+    # allocate once, in the data type of the raster, or use the given array
+    if out is None:
+        array = np.empty((len(band_list), row, col), dtype=_bands_dtype(ds, band_list))
+    else:
+        if (out.size != len(band_list) * row * col) or (not out.flags.c_contiguous) or (not out.flags.writeable):
+            raise ValueError('The "out" array should be a writeable C-contiguous array of shape %s, got %s.' %\
+                             (str((len(band_list), row, col) if len(band_list) > 1 else (row, col)), str(out.shape)))
+        array = out.reshape((len(band_list), row, col))
+
+    if len(band_list) == 1:
+        ds.GetRasterBand(band_list[0]).ReadAsArray(*window, buf_obj=array[0], **read_kwargs)
+    elif (workers > 1) and (file is not None):
+        # every thread reads its bands through its own dataset handle
+        def read_band(n):
+            _open(file).GetRasterBand(band_list[n]).ReadAsArray(*window, buf_obj=array[n], **read_kwargs)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(read_band, range(len(band_list))))
+    else:
+        try:
+            ds.ReadAsArray(*window, buf_obj=array, band_list=band_list, **read_kwargs)
+        except TypeError:
+            # band_list is not available in GDAL < 3.5, read the bands one by one
+            for n, index in enumerate(band_list):
+                ds.GetRasterBand(index).ReadAsArray(*window, buf_obj=array[n], **read_kwargs)
+
+    if out is not None:
+        return(out)
+    return(array[0] if len(band_list) == 1 else array)
     
-def read(file, bands='all'):
+def _mmap_bands(ds, file, bands, window=None):
+    """
+    Map the cells of an uncompressed GeoTIFF straight from the disk. The
+    array is built as a strided view over a read-only ``numpy.memmap`` of
+    the file, so no data is copied until it is actually accessed. Returns
+    None if the layout of the file can not be mapped.
+    """
+    if (not os.path.isfile(file)) or (ds.GetDriver().ShortName != 'GTiff'):
+        return(None)
+    if ds.GetMetadataItem('COMPRESSION', 'IMAGE_STRUCTURE') not in [None, 'NONE']:
+        return(None)
+
+    n_bands, row, col = ds.RasterCount, ds.RasterYSize, ds.RasterXSize
+    # bands that do not exist are left to GDAL, which raises its usual error
+    band_list = _band_list(ds, bands)
+    if (min(band_list) < 1) or (max(band_list) > n_bands):
+        return(None)
+
+    data_type = ds.GetRasterBand(1).DataType
+    if data_type in [gdal.GDT_CInt16, gdal.GDT_CInt32] or data_type not in utils.datatype_dict_num_np:
+        return(None)
+    for index in range(1, n_bands + 1):
+        band = ds.GetRasterBand(index)
+        if (band.DataType != data_type) or (band.GetMetadataItem('NBITS', 'IMAGE_STRUCTURE') is not None):
+            return(None)
+
+    # only layouts where a full row of cells is stored contiguously can be
+    # expressed as a strided view, i.e. strips or a single column of tiles
+    x_block, y_block = ds.GetRasterBand(1).GetBlockSize()
+    if x_block < col:
+        return(None)
+    n_yblocks = int(math.ceil(row / y_block))
+
+    with io.open(file, 'rb') as tif:
+        byte_order = '>' if tif.read(2) == b'MM' else '<'
+    dtype = np.dtype(utils.datatype_dict_num_np[data_type]).newbyteorder(byte_order)
+    itemsize = dtype.itemsize
+
+    def block_offsets(index):
+        band = ds.GetRasterBand(index)
+        offsets = [band.GetMetadataItem('BLOCK_OFFSET_0_%d' % (n), 'TIFF') for n in range(n_yblocks)]
+        if None in offsets:
+            return(None)
+        return([int(item) for item in offsets])
+
+    base_offsets = block_offsets(1)
+    if base_offsets is None:
+        return(None)
+    base = base_offsets[0]
+
+    if (n_bands == 1) or (ds.GetMetadataItem('INTERLEAVE', 'IMAGE_STRUCTURE') == 'PIXEL'):
+        strides = (itemsize, x_block * n_bands * itemsize, n_bands * itemsize)
+        band_offsets = [base_offsets]
+    else:
+        strides = [None, x_block * itemsize, itemsize]
+        band_offsets = [base_offsets] + [block_offsets(index) for index in range(2, n_bands + 1)]
+        if None in band_offsets:
+            return(None)
+        strides[0] = band_offsets[1][0] - base
+        if strides[0] <= 0:
+            return(None)
+        strides = tuple(strides)
+
+    # every block has to follow the previous one without any gap
+    for n, offsets in enumerate(band_offsets):
+        expected = [base + n * strides[0] + m * y_block * strides[1] for m in range(n_yblocks)]
+        if offsets != expected:
+            return(None)
+
+    length = (n_bands - 1) * strides[0] + (row - 1) * strides[1] + (col - 1) * strides[2] + itemsize
+    if base + length > os.path.getsize(file):
+        return(None)
+
+    mapped = np.memmap(file, dtype=np.uint8, mode='r', offset=base, shape=(length,))
+    array = np.ndarray(shape=(n_bands, row, col), dtype=dtype, buffer=mapped, strides=strides)
+
+    if window is not None:
+        xoff, yoff, xsize, ysize = [int(item) for item in window]
+        array = array[:, yoff:yoff+ysize, xoff:xoff+xsize]
+
+    # band selection, only selections that keep the array a view are served
+    if type(bands) == type('all'):
+        return(array[0] if n_bands == 1 else array)
+    elif type(bands) == type(1):
+        return(array[bands - 1])
+    elif list(bands) == list(range(bands[0], bands[0] + len(bands))):
+        array = array[bands[0] - 1:bands[-1]]
+        return(array[0] if array.shape[0] == 1 else array)
+    else:
+        return(None)
+
+def _vsimem_path(extension='.tif'):
+    # a unique file name in the in-memory file system of GDAL
+    return('/vsimem/pyrsgis_%s%s' % (uuid.uuid4().hex, extension))
+
+def _is_buffer(file):
+    return(isinstance(file, (bytes, bytearray, memoryview)) or hasattr(file, 'read'))
+
+def _buffer_to_vsimem(file):
+    """
+    Place the contents of a bytes-like or file-like object in a /vsimem/
+    file so that GDAL can open it. The file should be unlinked after use.
+    """
+    data = file.read() if hasattr(file, 'read') else file
+    path = _vsimem_path()
+    gdal.FileFromMemBuffer(path, data if isinstance(data, bytes) else bytes(data))
+    return(path)
+
+def _vsimem_bytes(path):
+    # read a /vsimem/ file into a bytes object and release it
+    stat = gdal.VSIStatL(path)
+    if stat is None:
+        return(None)
+    vsi_file = gdal.VSIFOpenL(path, 'rb')
+    try:
+        data = gdal.VSIFReadL(1, stat.size, vsi_file)
+    finally:
+        gdal.VSIFCloseL(vsi_file)
+        gdal.Unlink(path)
+    return(data)
+
+def _archive_prefix(file):
+    # GDAL virtual file system that reads members of the archive directly
+    if type(file) != type(''):
+        return(None)
+    name = file.lower()
+    if name.endswith('.zip'):
+        return('/vsizip/')
+    if name.endswith(('.tar', '.tar.gz', '.tgz')):
+        return('/vsitar/')
+    return(None)
+
+def _member_path(file, member):
+    return('%s%s/%s' % (_archive_prefix(file), os.path.abspath(file).replace('\\', '/'), member.lstrip('/')))
+
+def _archive_file(file, member):
+    # GDAL path of a raster inside an archive, None if the archive is not supported
+    if _archive_prefix(file) is None:
+        print('Unsupported archive. Acceptable archives are .zip, .tar, .tar.gz and .tgz files.')
+        return(None)
+    return(_member_path(file, member))
+
+def archive_members(file, extensions=('.tif', '.tiff', '.jp2', '.img', '.vrt')):
+    """
+    List the rasters in a zip or tar archive
+
+    The function lists the raster files inside a .zip, .tar, .tar.gz or .tgz archive,
+    without extracting it. The returned names can be passed as the ``member`` parameter
+    of ``pyrsgis.raster.read``, ``read_meta``, ``iter_blocks``, ``open`` and ``stats`` to
+    use the rasters straight from the archive.
+
+    Parameters
+    ----------
+    file            : string
+                      Path to the archive.
+
+    extensions      : tuple or list
+                      The file extensions that are treated as rasters.
+
+    Returns
+    -------
+    members         : list
+                      The paths of the raster files inside the archive.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> scene = r'E:/path_to_your_file/LC08_L2SP_146047_20200101.tar'
+    >>> members = raster.archive_members(scene)
+    >>> print(members)
+    ['LC08_L2SP_146047_20200101_SR_B1.TIF', 'LC08_L2SP_146047_20200101_SR_B2.TIF', ...]
+    >>> ds, red_arr = raster.read(scene, member=members[3])
+
+    """
+
+    if _archive_prefix(file) is None:
+        print('Unsupported archive. Acceptable archives are .zip, .tar, .tar.gz and .tgz files.')
+        return
+
+    names = gdal.ReadDirRecursive(_member_path(file, ''))
+    if names is None:
+        return([])
+    extensions = tuple([item.lower() for item in extensions])
+    return([name for name in names if name.lower().endswith(extensions)])
+
+def read(file, bands='all', window=None, bbox=None, mmap=False, out=None, workers=1,
+         scale=None, overview_level=None, resampling='nearest', member=None):
     """
     Read raster file
 
@@ -79,12 +541,72 @@ def read(file, bands='all'):
 
     Parameters
     ----------
-    file            : datasource object
-                      Path to the input file.
+    file            : string, bytes or file-like object
+                      Path to the input file. The contents of a raster file can also
+                      be passed as a bytes-like object or an object with a ``read``
+                      method (an opened file, ``io.BytesIO``, an HTTP response etc.),
+                      which is read through the in-memory file system of GDAL without
+                      touching the disk.
                       
-    bands           : integer, tuple, list or 'all'
+    bands           : integer, tuple, list, 'all' or None
                       Bands to read. This can either be a specific band number you wish
-                      to read or a list or tuple of band numbers or 'all'.
+                      to read or a list or tuple of band numbers or 'all'. If None, only
+                      the metadata is read and the returned array is None, see
+                      ``pyrsgis.raster.read_meta``.
+
+    window          : tuple or list, optional
+                      A pixel window to read, given as (xoff, yoff, xsize, ysize), where
+                      ``xoff`` and ``yoff`` are the column and row number (starting from 0)
+                      of the upper left cell. Only this part of the raster is read from the
+                      disk.
+
+    bbox            : tuple or list, optional
+                      A geographic bounding box to read, given in the same form as the ``bbox``
+                      attribute of the datasource object, that is, [[x_min, y_min], [x_max, y_max]].
+                      Cells that fall completely inside the bounding box are read. This is
+                      ignored if ``window`` is given.
+
+    mmap            : boolean
+                      If ``True`` and the file is an uncompressed GeoTIFF, the returned array
+                      is a read-only view that is memory-mapped to the file instead of being
+                      copied into memory. Cells are only loaded when they are accessed, which
+                      is useful when only small parts of a very large raster are touched. If
+                      the layout of the file can not be mapped (compressed files, tiled files
+                      with more than one tile per row, etc.), a normal read is performed.
+
+    out             : numpy array, optional
+                      A writeable, C-contiguous array to read the cells into, for example to
+                      reuse the same memory when reading many files or windows of the same
+                      size in a loop. Its shape should be the same as that of the array that
+                      would be returned otherwise. The cells are converted to the data type
+                      of this array. This is ignored if ``mmap`` is ``True``.
+
+    workers         : integer
+                      Number of threads used to read the bands. GDAL releases the GIL while
+                      reading and decompressing, so multiband rasters (especially compressed
+                      ones) can be read considerably faster with more than one thread. Every
+                      thread uses its own file handle and the result is identical to the
+                      sequential read.
+
+    scale           : float, optional
+                      Read the raster at a coarser resolution, for instance 1/8 reads an array
+                      with 8 times fewer rows and columns. If the file has overviews (pyramids),
+                      GDAL reads the cells from the most suitable overview instead of the full
+                      resolution data, which makes quick-looks of large rasters very fast.
+
+    overview_level  : integer, optional
+                      Read the given overview of the file, where 0 is the first (finest)
+                      overview, same as in GDAL. This is ignored if ``scale`` is given.
+
+    resampling      : string
+                      The resampling method used when reading at a coarser resolution. Options
+                      are 'nearest', 'bilinear', 'cubic', 'cubicspline', 'lanczos', 'average',
+                      'mode' and 'gauss'.
+
+    member          : string, optional
+                      If ``file`` is a .zip, .tar, .tar.gz or .tgz archive, the path of the
+                      raster inside the archive. The cells are read directly from the archive
+                      without extracting it. See ``pyrsgis.raster.archive_members``.
 
     Returns
     -------
@@ -140,25 +662,1043 @@ def read(file, bands='all'):
     to the following line:
 
     >>> print(ds.RasterCount, ds.RasterXSize, ds.RasterYSize)
+
+    If only a part of a large raster is needed, pass a pixel window or a bounding box.
+    Only the requested region is read from the disk and the returned ``ds`` object is
+    updated to match the sub-array, so it can directly be used to export the result.
+
+    >>> ds, data_arr = raster.read(input_file, window=(1000, 2000, 512, 512))
+    >>> print(data_arr.shape)
+    (6, 512, 512)
+    >>> ds, data_arr = raster.read(input_file, bbox=[[770000, 1420000], [790000, 1440000]])
+    >>> raster.export(data_arr, ds, r'E:/path_to_your_file/subset.tif')
+
+    Uncompressed GeoTIFFs can also be memory-mapped, in which case nothing is read
+    until the array is accessed. The array is read-only, copy it to modify the values.
+
+    >>> ds, data_arr = raster.read(input_file, mmap=True)
+
+    When reading many files of the same size, the same array can be reused:
+
+    >>> buffer = np.empty((6, 512, 512), dtype='uint16')
+    >>> for window in windows:
+    ...     ds, data_arr = raster.read(input_file, window=window, out=buffer)
+
+    A coarse version of the raster can be read from its overviews. The returned ``ds``
+    object has a matching cell size:
+
+    >>> ds, data_arr = raster.read(input_file, scale=1/8, resampling='average')
+    >>> ds, data_arr = raster.read(input_file, overview_level=2)
+
+    Rasters received over a network need not be saved to the disk first:
+
+    >>> ds, data_arr = raster.read(response.content)
+
+    Rasters inside zip or tar archives can be read without extracting them:
+
+    >>> ds, data_arr = raster.read(r'E:/path_to_your_file/scene.tar', member='B4.TIF')
     
     """
+
+    if member is not None:
+        file = _archive_file(file, member)
+        if file is None:
+            return(None, None)
+
+    if _is_buffer(file):
+        path = _buffer_to_vsimem(file)
+        try:
+            return(read(path, bands=bands, window=window, bbox=bbox, mmap=False, out=out,
+                        workers=workers, scale=scale, overview_level=overview_level,
+                        resampling=resampling))
+        finally:
+            gdal.Unlink(path)
     
-    ds = gdal.Open(file)
-    if type(bands) == type('all'):
-        if bands.lower()=='all':
-            array = ds.ReadAsArray()
-            ds = _create_ds(ds)
-            return(ds, array)
-    elif type(bands) == type(list()) or\
-         type(bands) == type(tuple()) or\
-         type(bands) == type(1):
-        array = _extract_bands(ds, bands)
+    ds = _open(file)
+
+    # resolve the region to read
+    if window is None and bbox is not None:
+        window = _window_from_bbox(ds, bbox)
+    if window is not None and not _valid_window(ds, window):
+        print("The requested window/bbox does not overlap the raster. Raster size is %d x %d (columns x rows)." %\
+              (ds.RasterXSize, ds.RasterYSize))
+        return(None, None)
+
+    # resolve the resolution to read
+    buf_shape = None
+    if (scale is not None) or (overview_level is not None):
+        buf_shape = _overview_shape(ds, window, scale, overview_level)
+        if buf_shape is None:
+            print("Overview level %s is not available. The file has %d overview(s)." %\
+                  (str(overview_level), ds.GetRasterBand(1).GetOverviewCount()))
+            return(None, None)
+        if resampling.lower() not in raster_resampling:
+            print("Invalid resampling. Acceptable options are %s." % (', '.join(raster_resampling.keys())))
+            return(None, None)
+
+    if bands is None:
         ds = _create_ds(ds)
-        return(ds, array)
-    else:
+        if window is not None: ds = _window_ds(ds, window)
+        if buf_shape is not None: ds = _scale_ds(ds, buf_shape)
+        return(ds, None)
+
+    if not _valid_bands(bands):
         print("Inappropriate bands selection. Please use the following arguments:\n1) bands = 'all'\n2) bands = [2, 3, 4]\n3) bands = 2")
         return(None, None)
 
+    array = _mmap_bands(ds, file, bands, window=window) if (mmap and buf_shape is None) else None
+    if array is None:
+        array = _extract_bands(ds, bands, window=window, out=out, file=file, workers=workers,
+                               buf_shape=buf_shape, resampling=resampling)
+    ds = _create_ds(ds)
+    if window is not None: ds = _window_ds(ds, window)
+    if buf_shape is not None: ds = _scale_ds(ds, buf_shape)
+    return(ds, array)
+
+def _overview_shape(ds, window, scale=None, overview_level=None):
+    """
+    Size (rows, cols) of the array to read for a given scale or overview
+    level. Returns None if the overview level does not exist.
+    """
+    if window is None:
+        window = (0, 0, ds.RasterXSize, ds.RasterYSize)
+
+    if scale is not None:
+        x_factor = y_factor = scale
+    else:
+        band = ds.GetRasterBand(1)
+        if not (0 <= overview_level < band.GetOverviewCount()):
+            return(None)
+        overview = band.GetOverview(overview_level)
+        x_factor = overview.XSize / ds.RasterXSize
+        y_factor = overview.YSize / ds.RasterYSize
+
+    return(max(int(round(window[3] * y_factor)), 1), max(int(round(window[2] * x_factor)), 1))
+
+def read_many(files, bands='all', window=None, bbox=None, workers=None):
+    """
+    Read many raster files in parallel
+
+    The function reads a list of raster files using a pool of threads and returns the
+    datasource object and the array of each file, in the same order as the input list.
+    Since GDAL releases the GIL while reading, this is much faster than reading the
+    files one after the other, especially for compressed files.
+
+    Parameters
+    ----------
+    files           : list or tuple
+                      Paths to the input files.
+
+    bands           : integer, tuple, list or 'all'
+                      Bands to read from each file. This is same as the ``bands`` parameter of
+                      the ``pyrsgis.raster.read`` function.
+
+    window          : tuple or list, optional
+                      A pixel window to read from each file, see ``pyrsgis.raster.read``.
+
+    bbox            : tuple or list, optional
+                      A geographic bounding box to read from each file, see ``pyrsgis.raster.read``.
+
+    workers         : integer, optional
+                      Number of threads to use. By default, this is decided by Python based
+                      on the number of processors.
+
+    Returns
+    -------
+    results         : list
+                      A list of (datasource, data_array) tuples, one for each input file.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> band_files = [r'E:/path_to_your_file/B%d.tif' % (n) for n in range(1, 8)]
+    >>> results = raster.read_many(band_files, workers=4)
+    >>> ds = results[0][0]
+    >>> data_arr = np.stack([arr for _, arr in results])
+
+    """
+
+    def read_file(file):
+        return(read(file, bands=bands, window=window, bbox=bbox))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return(list(pool.map(read_file, files)))
+
+def read_meta(file, member=None):
+    """
+    Read raster metadata
+
+    The function reads only the header of the raster file and generates the
+    datasource object, without reading any cell values. This is much faster than
+    ``pyrsgis.raster.read`` for large files when only the projection, geotransform,
+    size, etc. of the raster are needed, for instance, to use the raster as a
+    reference grid for export.
+
+    Parameters
+    ----------
+    file            : string
+                      Path to the input file.
+
+    member          : string, optional
+                      The path of the raster inside the archive, if ``file`` is a zip
+                      or tar archive. This is same as in ``pyrsgis.raster.read``.
+
+    Returns
+    -------
+    datasource      : datasource object
+                      A data source object that contains the metadata of the raster file.
+                      This is the same as the one returned by ``pyrsgis.raster.read``.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> ref_file = r'E:/path_to_your_file/reference_file.tif'
+    >>> ds = raster.read_meta(ref_file)
+    >>> print(ds.RasterCount, ds.RasterYSize, ds.RasterXSize)
+
+    The ``ds`` object can be used to export any array of matching size:
+
+    >>> raster.export(new_arr, ds, r'E:/path_to_your_file/new_file.tif')
+
+    """
+
+    ds, _ = read(file, bands=None, member=member)
+    return(ds)
+
+def _valid_bands(bands):
+    if type(bands) == type('all'):
+        return(bands.lower() == 'all')
+    return(type(bands) == type(list()) or\
+           type(bands) == type(tuple()) or\
+           type(bands) == type(1))
+
+def _block_windows(ds, block_shape):
+    """
+    Generate pixel windows (xoff, yoff, xsize, ysize) that tile the raster
+    in row-major order. ``block_shape`` is given as (rows, cols), the blocks
+    at the right and bottom edges are cropped to the raster size.
+    """
+    y_block, x_block = [int(item) for item in block_shape]
+    for yoff in range(0, ds.RasterYSize, y_block):
+        for xoff in range(0, ds.RasterXSize, x_block):
+            yield(xoff, yoff,
+                  min(x_block, ds.RasterXSize - xoff),
+                  min(y_block, ds.RasterYSize - yoff))
+
+def _native_block_shape(ds):
+    # GDAL reports the block size as [xsize, ysize]
+    x_block, y_block = ds.GetRasterBand(1).GetBlockSize()
+    return(y_block, x_block)
+
+def _stream_block_shape(ds, min_cells=2**22):
+    """
+    Native block shape of the file, where strips are grouped so that a block
+    has at least ``min_cells`` cells. This avoids reading striped files one
+    strip at a time when streaming them.
+    """
+    y_block, x_block = _native_block_shape(ds)
+    if x_block < ds.RasterXSize:
+        return(y_block, x_block)
+    n_strips = max(int(math.ceil(min_cells / float(y_block * ds.RasterXSize))), 1)
+    return(y_block * n_strips, x_block)
+
+def _read_halo(ds, bands, window, halo=0):
+    """
+    Read a window grown by ``halo`` cells on each side. The parts of the halo
+    that fall outside the raster are filled by repeating the edge cells, so
+    the core window is always array[..., halo:-halo, halo:-halo].
+    """
+    if halo == 0:
+        return(_extract_bands(ds, bands, window=window))
+
+    xoff, yoff, xsize, ysize = window
+    read_xmin, read_ymin = max(xoff - halo, 0), max(yoff - halo, 0)
+    read_xmax = min(xoff + xsize + halo, ds.RasterXSize)
+    read_ymax = min(yoff + ysize + halo, ds.RasterYSize)
+
+    array = _extract_bands(ds, bands, window=(read_xmin, read_ymin, read_xmax - read_xmin, read_ymax - read_ymin))
+
+    pad_width = [(halo - (yoff - read_ymin), halo - (read_ymax - yoff - ysize)),
+                 (halo - (xoff - read_xmin), halo - (read_xmax - xoff - xsize))]
+    if len(array.shape) == 3:
+        pad_width = [(0, 0)] + pad_width
+
+    return(np.pad(array, pad_width, mode='edge'))
+
+def iter_blocks(file, bands='all', block_shape=None, halo=0, prefetch=0, timings=None, member=None):
+    """
+    Iterate over a raster file block by block
+
+    This function is a generator that reads the raster file one block at a time,
+    so that rasters larger than the available memory can be processed in constant
+    memory. Each step yields the pixel window, a datasource object for that window
+    and the array of cell values.
+
+    Parameters
+    ----------
+    file            : string
+                      Path to the input file.
+
+    bands           : integer, tuple, list or 'all'
+                      Bands to read. This is same as the ``bands`` parameter of the
+                      ``pyrsgis.raster.read`` function.
+
+    block_shape     : tuple or list, optional
+                      Size of the blocks as (rows, cols). If not given, the native block
+                      layout of the file is used, which is the fastest way to read a GeoTIFF.
+                      Blocks at the right and bottom edges of the raster can be smaller.
+
+    halo            : integer
+                      Number of extra cells to read on each side of the block. This is useful
+                      for neighbourhood (moving window) operations. Outside the raster, the
+                      halo is filled by repeating the edge cells.
+
+    prefetch        : integer
+                      Number of blocks to read ahead on background threads while the current
+                      block is being processed, so that reading and decompressing overlaps
+                      with the computation. Every thread uses its own file handle. The blocks
+                      are still yielded in order. 0 reads each block only when it is needed.
+
+    timings         : dict, optional
+                      If given, it is filled with the total time in seconds the caller waited
+                      for blocks ('wait'), the total time spent reading them ('read') and the
+                      number of blocks ('blocks'). A 'wait' close to zero means that reading
+                      is hidden behind the computation, otherwise a deeper ``prefetch`` can help.
+
+    member          : string, optional
+                      The path of the raster inside the archive, if ``file`` is a zip
+                      or tar archive. This is same as in ``pyrsgis.raster.read``.
+
+    Yields
+    ------
+    window          : tuple
+                      The block as (xoff, yoff, xsize, ysize) in cells, without the halo.
+
+    datasource      : datasource object
+                      A datasource object describing the returned array, that is, the block
+                      including the halo.
+
+    data_array      : numpy array
+                      A 2D or 3D array of the block. With a halo, the block itself is
+                      ``data_array[..., halo:-halo, halo:-halo]``.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> input_file = r'E:/path_to_your_file/raster_file.tif'
+    >>> for window, ds, arr in raster.iter_blocks(input_file, bands=1):
+    ...     print(window, arr.mean())
+
+    Use the ``halo`` parameter if the computation needs the neighbouring cells, and
+    crop the halo out of the result:
+
+    >>> for window, ds, arr in raster.iter_blocks(input_file, block_shape=(512, 512), halo=2):
+    ...     core = arr[..., 2:-2, 2:-2]
+
+    To read the next blocks while processing the current one, and find out how long
+    the loop waited for the data:
+
+    >>> timings = {}
+    >>> for window, ds, arr in raster.iter_blocks(input_file, prefetch=2, timings=timings):
+    ...     result = expensive_function(arr)
+    >>> print(timings)
+
+    """
+
+    if member is not None:
+        file = _archive_file(file, member)
+        if file is None:
+            return
+    src = _open(file)
+    if not _valid_bands(bands):
+        print("Inappropriate bands selection. Please use the following arguments:\n1) bands = 'all'\n2) bands = [2, 3, 4]\n3) bands = 2")
+        return
+
+    ds = _create_ds(src)
+    if block_shape is None:
+        block_shape = _native_block_shape(src)
+
+    if timings is None:
+        timings = {}
+    timings.update({'wait': 0.0, 'read': 0.0, 'blocks': 0})
+    prefetch = max(int(prefetch), 0)
+
+    def read_block(window):
+        # background threads can not share the GDAL handle of the caller
+        start = time.perf_counter()
+        array = _read_halo(_open(file) if prefetch else src, bands, window, halo=halo)
+        return(array, time.perf_counter() - start)
+
+    def block_result(window, future):
+        start = time.perf_counter()
+        array, read_time = future.result() if prefetch else read_block(window)
+        timings['wait'] += time.perf_counter() - start
+        timings['read'] += read_time
+        timings['blocks'] += 1
+        xoff, yoff, xsize, ysize = window
+        out_ds = _window_ds(ds, (xoff - halo, yoff - halo, xsize + 2 * halo, ysize + 2 * halo))
+        return(window, out_ds, array)
+
+    if prefetch == 0:
+        for window in _block_windows(ds, block_shape):
+            yield(block_result(window, None))
+        return
+
+    # keep the next blocks being read while the current one is processed
+    executor = ThreadPoolExecutor(max_workers=prefetch)
+    pending = deque()
+    try:
+        for window in _block_windows(ds, block_shape):
+            pending.append((window, executor.submit(read_block, window)))
+            if len(pending) > prefetch:
+                yield(block_result(*pending.popleft()))
+        while len(pending) > 0:
+            yield(block_result(*pending.popleft()))
+    finally:
+        for window, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+def _lazy_ds(ds, shape, dtype):
+    # datasource object of a lazy raster with the given shape and numpy type
+    out_ds = deepcopy(ds)
+    out_ds.RasterCount = shape[0] if len(shape) == 3 else 1
+    out_ds.DataType = raster_dtype[utils.datatype_dict_np_str[np.dtype(dtype).name]]
+    out_ds.dtypes = [utils.datatype_dict_num_str[out_ds.DataType]] * out_ds.RasterCount
+    return(out_ds)
+
+# numpy types that GDAL writes without a conversion, 64-bit integers since
+# GDAL 3.5 and signed bytes since GDAL 3.7
+_gdal_write_dtypes = [np.dtype(item) for item in utils.datatype_dict_num_np.values()]
+for _name, _type in [('GDT_Int64', 'int64'), ('GDT_UInt64', 'uint64'), ('GDT_Int8', 'int8')]:
+    if hasattr(gdal, _name):
+        _gdal_write_dtypes.append(np.dtype(_type))
+
+def _write_block(outdata, block, xoff, yoff):
+    # write a 2D or 3D block at the given offset in one dataset-level call,
+    # GDAL converts the cells to the type of the output file while writing
+    if len(block.shape) == 2:
+        block = block[np.newaxis, :, :]
+
+    # other types go through float64, like gdal_array does, so that GDAL clamps
+    # out of range values instead of numpy wrapping them. They are converted
+    # one band at a time, which never copies the whole stack
+    if block.dtype.newbyteorder('=') not in _gdal_write_dtypes:
+        convert = np.dtype('float64')
+    elif not block.dtype.isnative:
+        convert = block.dtype.newbyteorder('=')
+    else:
+        convert = None
+
+    if convert is None:
+        try:
+            outdata.WriteArray(block, int(xoff), int(yoff))
+            return
+        except AttributeError:
+            # Dataset.WriteArray is not available in older GDAL versions
+            pass
+    for n in range(block.shape[0]):
+        band = block[n] if convert is None else block[n].astype(convert)
+        outdata.GetRasterBand(n + 1).WriteArray(band, int(xoff), int(yoff))
+
+def _band_view(arr, band_list):
+    """
+    Select the bands (numbered from 1) of a 3D array as a view, which is
+    possible when the band numbers are evenly spaced and exist in the array.
+    Returns None otherwise.
+    """
+    index = [item - 1 for item in band_list]
+    if (min(index) < 0) or (max(index) >= arr.shape[0]):
+        return(None)
+    if len(index) == 1:
+        return(arr[index[0]:index[0] + 1])
+    step = index[1] - index[0]
+    if (step == 0) or (index != list(range(index[0], index[0] + step * len(index), step))):
+        return(None)
+    stop = index[-1] + (1 if step > 0 else -1)
+    return(arr[index[0]:stop if stop >= 0 else None:step])
+
+class RasterWriter():
+    """
+    Write a GeoTIFF file block by block
+
+    The ``RasterWriter`` creates a GeoTIFF file on the grid of the given datasource object
+    and accepts blocks of cell values, in any order, through its ``write`` method. Only the
+    block being written needs to be in memory, which allows exporting rasters larger than
+    the available memory, and combined with ``pyrsgis.raster.iter_blocks``, processing
+    them block by block. NoData, overviews and flushing to the disk are handled when the
+    writer is closed. It is typically used as a context manager.
+
+    Parameters
+    ----------
+    filename        : string
+                      Output file name ending with '.tif'.
+
+    ds              : datasource object
+                      The datasource object of the output raster, which defines its size,
+                      projection and geotransform.
+
+    dtype           : string
+                      The data type of the output raster, same as in ``pyrsgis.raster.export``.
+
+    bands           : integer, optional
+                      Number of bands of the output raster. Defaults to the number of bands
+                      of the ``ds`` object.
+
+    nodata          : signed integer
+                      The value to treat as NoData in the output raster.
+
+    compress        : string
+                      Compression type of the output raster, for example 'LZW' or 'DEFLATE'.
+
+    overviews       : list, optional
+                      Decimation factors of the overviews to build when the writer is closed.
+
+    resampling      : string
+                      The resampling method used to build the overviews.
+
+    layout          : string
+                      Internal organisation of the output file, 'strip', 'tiled' or 'cog'. A
+                      'cog' file is first written as a temporary tiled file next to the output
+                      and converted to a Cloud Optimized GeoTIFF when the writer is closed.
+
+    block_size      : integer, optional
+                      Size of the tiles for the 'tiled' and 'cog' layouts.
+
+    predictor       : integer, optional
+                      The compression predictor, 1 (none), 2 (horizontal) or 3 (floating point).
+
+    compress_level  : integer, optional
+                      Compression level of the chosen compression method.
+
+    num_threads     : integer or string, optional
+                      Number of threads to use for compression, or 'ALL_CPUS'.
+
+    background      : boolean
+                      If ``True``, the blocks are queued and compressed and written to the
+                      file on a background thread, so that the caller can compute the next
+                      block meanwhile. The blocks must not be modified after they are passed
+                      to ``write``. Errors of the background thread are raised by ``write``,
+                      ``close`` or ``result``.
+
+    queue_size      : integer
+                      Maximum number of blocks waiting to be written in the background. When
+                      the queue is full, ``write`` waits until a block has been written, which
+                      limits the memory used by the queued blocks.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> infile = r'E:/path_to_your_file/landsat8_multispectral.tif'
+    >>> outfile = r'E:/path_to_your_file/landsat8_ndvi.tif'
+    >>> ds = raster.read_meta(infile)
+    >>> with raster.RasterWriter(outfile, ds, dtype='float32', bands=1, compress='DEFLATE') as writer:
+    ...     for window, block_ds, arr in raster.iter_blocks(infile, bands=[4, 5]):
+    ...         red, nir = arr.astype('float32')
+    ...         writer.write((nir - red) / (nir + red), window)
+
+    """
+
+    def __init__(self, filename, ds, dtype='default', bands=None, nodata=-9999, compress=None,
+                 overviews=None, resampling='average', layout='strip', block_size=None, predictor=None,
+                 compress_level=None, num_threads=None, background=False, queue_size=4):
+        self.ds = ds
+        self.filename = _tif_filename(filename)
+        self.n_bands = ds.RasterCount if bands is None else int(bands)
+        self.nodata = nodata
+        self.overviews = overviews
+        self.resampling = resampling
+        self._lock = threading.Lock()
+
+        # a COG can not be written block by block, write a tiled file first
+        self._cog_options = None
+        out_file = self.filename
+        if layout.lower() == 'cog':
+            self._cog_options = _cog_options(compress=compress, block_size=block_size, predictor=predictor,
+                                             compress_level=compress_level, num_threads=num_threads,
+                                             resampling=resampling)
+            out_file = '%s_pyrsgis_tmp.tif' % (os.path.splitext(self.filename)[0])
+            options = _creation_options(layout='tiled', block_size=block_size)
+        else:
+            options = _creation_options(compress=compress, layout=layout, block_size=block_size,
+                                        predictor=predictor, compress_level=compress_level,
+                                        num_threads=num_threads)
+
+        self._outdata = _create_file(out_file, ds, ds.RasterXSize, ds.RasterYSize, self.n_bands,
+                                     dtype=dtype, options=options)
+        self._out_file = out_file
+
+        # blocks are handed over to the background thread through a bounded queue
+        self._error = None
+        self._closing = False
+        self._thread = None
+        self._slot = None
+        if background:
+            self._queue = queue.Queue(maxsize=max(int(queue_size), 1))
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def __enter__(self):
+        return(self)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, block, window=None):
+        """
+        Write a 2D or 3D block of cell values.
+
+        Parameters
+        ----------
+        block           : array
+                          A 2D array for single band, or a 3D array with all the bands of
+                          the output raster.
+
+        window          : tuple or list, optional
+                          Position of the block as (xoff, yoff, xsize, ysize), as yielded by
+                          ``pyrsgis.raster.iter_blocks``, or just (xoff, yoff). If not given,
+                          the block is written at the upper left corner.
+        """
+        if (self._outdata is None) or self._closing:
+            raise ValueError('The RasterWriter has already been closed.')
+        self._raise_error()
+
+        block = np.asarray(block)
+        row, col = block.shape[-2:]
+        n_bands = block.shape[0] if len(block.shape) == 3 else 1
+        xoff, yoff = (0, 0) if window is None else [int(item) for item in window[:2]]
+
+        if (window is not None) and (len(window) == 4) and (tuple(window[2:]) != (col, row)):
+            raise ValueError('The block of shape %s does not match the window %s.' % (str(block.shape), str(tuple(window))))
+        if (n_bands != self.n_bands) or (xoff < 0) or (yoff < 0) or\
+           (xoff + col > self.ds.RasterXSize) or (yoff + row > self.ds.RasterYSize):
+            raise ValueError('The block of shape %s at (%d, %d) does not fit in the output raster of shape %s.' %\
+                             (str(block.shape), xoff, yoff, str((self.n_bands, self.ds.RasterYSize, self.ds.RasterXSize))))
+
+        if self._thread is not None:
+            self._queue.put((block, xoff, yoff))
+            return
+
+        with self._lock:
+            _write_block(self._outdata, block, xoff, yoff)
+
+    def close(self):
+        """
+        Set the NoData value, build the overviews and flush the file to the disk. For
+        the 'cog' layout, this is when the Cloud Optimized GeoTIFF is created. With a
+        background writer, this waits until all the queued blocks are written.
+        """
+        if self._thread is None:
+            with self._lock:
+                self._finish()
+            return
+
+        self._submit_close()
+        self._thread.join()
+        self._raise_error()
+
+    def result(self):
+        """
+        Wait until the file is completely written and closed, and return its name.
+        Errors of the background thread are raised here.
+        """
+        self.close()
+        return(self.filename)
+
+    def _submit_close(self):
+        # ask the background thread to close the file after the queued blocks
+        if not self._closing:
+            self._closing = True
+            self._queue.put(None)
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise self._error
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    self._finish()
+                elif self._error is None:
+                    _write_block(self._outdata, *item)
+            except Exception as error:
+                if self._error is None:
+                    self._error = error
+            if item is None:
+                # let the next background export start
+                if self._slot is not None:
+                    self._slot.release()
+                return
+
+    def _finish(self):
+        if self._outdata is None:
+            return
+        for n in range(self.n_bands):
+            self._outdata.GetRasterBand(n + 1).SetNoDataValue(self.nodata)
+        if self.overviews:
+            self._outdata.BuildOverviews(self.resampling.upper(), [int(item) for item in self.overviews])
+        self._outdata.FlushCache()
+
+        if self._cog_options is not None:
+            clear_cache(self.filename)
+            cog = gdal.GetDriverByName('COG').CreateCopy(self.filename, self._outdata, options=self._cog_options)
+            cog.FlushCache()
+            cog = None
+            self._outdata = None
+            gdal.GetDriverByName('GTiff').Delete(self._out_file)
+        self._outdata = None
+
+class LazyRaster():
+    """
+    Raster with deferred computation
+
+    A ``LazyRaster`` represents the cell values of a raster file, or the result of
+    computations on such rasters, without reading or computing anything. Slicing,
+    band selection and NumPy style arithmetic only build an expression, which is
+    evaluated block by block within a memory budget when ``compute`` or ``to_file``
+    is called. This allows processing rasters that are much larger than the memory,
+    and keeps the temporary arrays of every intermediate step small. A ``LazyRaster``
+    is typically created using the ``pyrsgis.raster.open`` function.
+
+    Attributes
+    ----------
+    ds              : datasource object
+                      The datasource object of the (resulting) raster, which can be used
+                      to export arrays computed from it.
+
+    shape           : tuple
+                      Shape of the array that ``compute`` will return, (bands, rows, cols)
+                      for multiband and (rows, cols) for single band rasters.
+
+    dtype           : numpy dtype
+                      Data type of the array that ``compute`` will return.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> img = raster.open(r'E:/path_to_your_file/landsat8_multispectral.tif')
+    >>> red, nir = img[3].astype('float32'), img[4].astype('float32')
+    >>> ndvi = (nir - red) / (nir + red)
+    >>> print(ndvi.shape, ndvi.dtype)
+    (2054, 2044) float32
+
+    Nothing has been read from the disk so far. The expression can be evaluated to an
+    array, or streamed directly to a GeoTIFF file without holding the full raster in memory:
+
+    >>> ndvi.to_file(r'E:/path_to_your_file/landsat8_ndvi.tif', compress='DEFLATE')
+
+    Slicing selects bands and a part of the raster, just like for NumPy arrays:
+
+    >>> ndvi_subset = ndvi[1000:1512, 500:1012].compute()
+
+    """
+
+    def __init__(self, ds, shape, dtype, source=None, func=None, operands=()):
+        self.ds = ds
+        self.shape = tuple(int(item) for item in shape)
+        self.dtype = np.dtype(dtype)
+        self._source = source
+        self._func = func
+        self._operands = tuple(operands)
+
+    @property
+    def ndim(self):
+        return(len(self.shape))
+
+    def __repr__(self):
+        return('LazyRaster(shape=%s, dtype=%s)' % (str(self.shape), self.dtype.name))
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.compute()
+        return(array if dtype is None else array.astype(dtype, copy=False))
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        # only element-wise calls with scalars and other lazy rasters are deferred
+        if (method != '__call__') or ('out' in kwargs) or (ufunc.nout != 1):
+            return(NotImplemented)
+        for item in inputs:
+            if (not isinstance(item, LazyRaster)) and (np.ndim(item) != 0):
+                return(NotImplemented)
+
+        # the cells of the operands should fall on the same grid
+        lazy_inputs = [item for item in inputs if isinstance(item, LazyRaster)]
+        grid = lazy_inputs[0].ds
+        for item in lazy_inputs[1:]:
+            if ((item.ds.RasterYSize, item.ds.RasterXSize) != (grid.RasterYSize, grid.RasterXSize)) or\
+               (tuple(item.ds.GeoTransform) != tuple(grid.GeoTransform)) or\
+               (not _same_projection(item.ds.Projection, grid.Projection)):
+                raise ValueError('LazyRaster operands should have the same size, geotransform and projection.')
+        shape = np.broadcast_shapes(*[item.shape for item in lazy_inputs])
+        dtype = ufunc(*[np.empty(0, dtype=item.dtype) if isinstance(item, LazyRaster) else item
+                        for item in inputs], **kwargs).dtype
+        template = max(lazy_inputs, key=lambda item: item.ndim)
+
+        def func(*arrays):
+            return(ufunc(*arrays, **kwargs))
+
+        return(LazyRaster(_lazy_ds(template.ds, shape, dtype), shape, dtype, func=func, operands=inputs))
+
+    def __add__(self, other): return(np.add(self, other))
+    def __radd__(self, other): return(np.add(other, self))
+    def __sub__(self, other): return(np.subtract(self, other))
+    def __rsub__(self, other): return(np.subtract(other, self))
+    def __mul__(self, other): return(np.multiply(self, other))
+    def __rmul__(self, other): return(np.multiply(other, self))
+    def __truediv__(self, other): return(np.true_divide(self, other))
+    def __rtruediv__(self, other): return(np.true_divide(other, self))
+    def __floordiv__(self, other): return(np.floor_divide(self, other))
+    def __rfloordiv__(self, other): return(np.floor_divide(other, self))
+    def __mod__(self, other): return(np.remainder(self, other))
+    def __rmod__(self, other): return(np.remainder(other, self))
+    def __pow__(self, other): return(np.power(self, other))
+    def __rpow__(self, other): return(np.power(other, self))
+    def __and__(self, other): return(np.bitwise_and(self, other))
+    def __rand__(self, other): return(np.bitwise_and(other, self))
+    def __or__(self, other): return(np.bitwise_or(self, other))
+    def __ror__(self, other): return(np.bitwise_or(other, self))
+    def __xor__(self, other): return(np.bitwise_xor(self, other))
+    def __rxor__(self, other): return(np.bitwise_xor(other, self))
+    def __lt__(self, other): return(np.less(self, other))
+    def __le__(self, other): return(np.less_equal(self, other))
+    def __gt__(self, other): return(np.greater(self, other))
+    def __ge__(self, other): return(np.greater_equal(self, other))
+    def __eq__(self, other): return(np.equal(self, other))
+    def __ne__(self, other): return(np.not_equal(self, other))
+    def __neg__(self): return(np.negative(self))
+    def __pos__(self): return(np.positive(self))
+    def __abs__(self): return(np.absolute(self))
+    def __invert__(self): return(np.invert(self))
+
+    __hash__ = object.__hash__
+
+    def astype(self, dtype):
+        """
+        Cast the cell values to the given data type, for example 'float32'.
+        """
+        dtype = np.dtype(dtype)
+
+        def func(array):
+            return(array.astype(dtype, copy=False))
+
+        return(LazyRaster(_lazy_ds(self.ds, self.shape, dtype), self.shape, dtype, func=func, operands=[self]))
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if Ellipsis in key:
+            index = key.index(Ellipsis)
+            key = key[:index] + (slice(None),) * (self.ndim - len(key) + 1) + key[index + 1:]
+        if len(key) > self.ndim:
+            raise IndexError('Too many indices for a LazyRaster of shape %s.' % (str(self.shape)))
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        # rows and columns can only be sliced, so that the result is still a raster
+        window = []
+        for item, size in zip(key[-2:], self.shape[-2:]):
+            if not isinstance(item, slice):
+                raise IndexError('Rows and columns of a LazyRaster can only be sliced, e.g. raster[:, 10:20, 5:15].')
+            start, stop, step = item.indices(size)
+            if (step != 1) or (stop <= start):
+                raise IndexError('Rows and columns should be sliced with a step of 1 and a non-empty range.')
+            window += [start, stop - start]
+        yoff, ysize, xoff, xsize = window
+
+        band_key = None
+        if self.ndim == 3:
+            n_bands = self.shape[0]
+            if isinstance(key[0], slice):
+                band_key = list(range(*key[0].indices(n_bands)))
+            elif np.ndim(key[0]) == 0:
+                band_key = int(key[0]) + n_bands if int(key[0]) < 0 else int(key[0])
+                if not (0 <= band_key < n_bands):
+                    raise IndexError('Band index %d is out of range for %d bands.' % (int(key[0]), n_bands))
+            else:
+                band_key = [int(item) + n_bands if int(item) < 0 else int(item) for item in key[0]]
+            if isinstance(band_key, list) and (len(band_key) == 0):
+                raise IndexError('The band selection is empty.')
+
+        return(self._slice(band_key, (xoff, yoff, xsize, ysize)))
+
+    def _slice(self, band_key, window):
+        # push the selection down to the sources, so only the needed cells are read
+        xoff, yoff, xsize, ysize = window
+        if (self.ndim == 3) and isinstance(band_key, list):
+            shape = (len(band_key), ysize, xsize)
+        elif self.ndim == 3 and band_key is None:
+            shape = (self.shape[0], ysize, xsize)
+        else:
+            shape = (ysize, xsize)
+        ds = _lazy_ds(_window_ds(self.ds, window), shape, self.dtype)
+
+        if self._source is not None:
+            file, band_list, x0, y0 = self._source
+            if band_key is not None:
+                band_list = [band_list[band_key]] if type(band_key) == type(1) else [band_list[n] for n in band_key]
+            return(LazyRaster(ds, shape, self.dtype, source=(file, band_list, x0 + xoff, y0 + yoff)))
+
+        operands = []
+        for item in self._operands:
+            if not isinstance(item, LazyRaster):
+                operands.append(item)
+                continue
+            item_key = None
+            if (item.ndim == 3) and (band_key is not None):
+                # a single band operand is broadcast over all the bands
+                if (item.shape[0] == 1) and (self.shape[0] != 1):
+                    item_key = 0 if type(band_key) == type(1) else [0]
+                else:
+                    item_key = band_key
+            operands.append(item._slice(item_key, window))
+
+        return(LazyRaster(ds, shape, self.dtype, func=self._func, operands=operands))
+
+    def _evaluate(self, window, memo):
+        # every node is evaluated once per window, even if it is used many times
+        if id(self) in memo:
+            return(memo[id(self)])
+
+        xoff, yoff, xsize, ysize = window
+        if self._source is not None:
+            file, band_list, x0, y0 = self._source
+            array = _extract_bands(_open(file), band_list, window=(x0 + xoff, y0 + yoff, xsize, ysize))
+            array = array.reshape(self.shape[:-2] + (ysize, xsize))
+        else:
+            array = self._func(*[item._evaluate(window, memo) if isinstance(item, LazyRaster) else item
+                                 for item in self._operands])
+
+        memo[id(self)] = array
+        return(array)
+
+    def _cell_bytes(self, seen):
+        # memory needed per cell to evaluate the whole expression
+        if id(self) in seen:
+            return(0)
+        seen.add(id(self))
+        n_bytes = (self.shape[0] if self.ndim == 3 else 1) * self.dtype.itemsize
+        return(n_bytes + sum([item._cell_bytes(seen) for item in self._operands if isinstance(item, LazyRaster)]))
+
+    def _block_shape(self, max_memory):
+        cell_bytes = self._cell_bytes(set())
+        row, col = self.shape[-2:]
+        block_rows = int(max_memory // (cell_bytes * col))
+        if block_rows >= 1:
+            return(min(block_rows, row), col)
+        return(1, max(int(max_memory // cell_bytes), 1))
+
+    def compute(self, max_memory=256 * 2**20):
+        """
+        Evaluate the expression and return the result as a numpy array.
+
+        Parameters
+        ----------
+        max_memory      : integer
+                          Memory budget in bytes for the intermediate arrays. The raster is
+                          evaluated in blocks small enough to fit in this budget. Note that the
+                          returned array itself is not counted in the budget.
+
+        Returns
+        -------
+        data_array      : numpy array
+                          A 2D or 3D array of shape ``shape`` and data type ``dtype``.
+        """
+        array = np.empty(self.shape, dtype=self.dtype)
+        for window in _block_windows(self.ds, self._block_shape(max_memory)):
+            xoff, yoff, xsize, ysize = window
+            array[..., yoff:yoff+ysize, xoff:xoff+xsize] = self._evaluate(window, {})
+        return(array)
+
+    def to_file(self, filename, dtype='default', nodata=-9999, compress=None, max_memory=256 * 2**20):
+        """
+        Evaluate the expression block by block and write the result to a GeoTIFF file.
+
+        Parameters
+        ----------
+        filename        : string
+                          Output file name ending with '.tif'.
+
+        dtype           : string
+                          The data type of the output raster, same as in ``pyrsgis.raster.export``.
+                          The 'default' value picks the data type from the ``dtype`` attribute.
+
+        nodata          : signed integer
+                          The value to treat as NoData in the output raster.
+
+        compress        : string
+                          Compression type of the output raster, for example 'LZW' or 'DEFLATE'.
+
+        max_memory      : integer
+                          Memory budget in bytes for evaluating the blocks.
+        """
+        n_bands = self.shape[0] if self.ndim == 3 else 1
+        with RasterWriter(filename, self.ds, dtype=dtype, bands=n_bands, nodata=nodata, compress=compress) as writer:
+            for window in _block_windows(self.ds, self._block_shape(max_memory)):
+                writer.write(self._evaluate(window, {}), window)
+
+def open(file, bands='all', member=None):
+    """
+    Open raster file lazily
+
+    The function opens the raster file as a ``pyrsgis.raster.LazyRaster`` without reading any
+    cell values. Computations on the returned object are deferred and evaluated block by block,
+    which allows processing rasters larger than the available memory.
+
+    Parameters
+    ----------
+    file            : string
+                      Path to the input file.
+
+    bands           : integer, tuple, list or 'all'
+                      Bands to use. This is same as the ``bands`` parameter of the
+                      ``pyrsgis.raster.read`` function, that is, band numbers start from 1.
+
+    member          : string, optional
+                      The path of the raster inside the archive, if ``file`` is a zip
+                      or tar archive. This is same as in ``pyrsgis.raster.read``.
+
+    Returns
+    -------
+    lazy_raster     : LazyRaster
+                      A ``LazyRaster`` object. Its ``shape`` is the same as the shape of the
+                      array that ``pyrsgis.raster.read`` would return.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> img = raster.open(r'E:/path_to_your_file/landsat8_multispectral.tif')
+    >>> print(img.shape)
+    (6, 2054, 2044)
+    >>> ndvi = (img[4] - img[3]) / (img[4] + img[3])
+    >>> ndvi.to_file(r'E:/path_to_your_file/landsat8_ndvi.tif')
+
+    Please note that unlike ``pyrsgis.raster.read``, the indices used for slicing the object
+    start from 0, as for NumPy arrays.
+
+    """
+
+    if member is not None:
+        file = _archive_file(file, member)
+        if file is None:
+            return(None)
+    src = _open(file)
+    if not _valid_bands(bands):
+        print("Inappropriate bands selection. Please use the following arguments:\n1) bands = 'all'\n2) bands = [2, 3, 4]\n3) bands = 2")
+        return(None)
+
+    band_list = _band_list(src, bands)
+    dtype = _bands_dtype(src, band_list)
+    shape = (src.RasterYSize, src.RasterXSize)
+    if len(band_list) > 1:
+        shape = (len(band_list),) + shape
+
+    ds = _create_ds(src)
+    ds.RasterCount = len(band_list)
+    ds.DataType = src.GetRasterBand(band_list[0]).DataType
+    ds.dtypes = [ds.dtypes[index - 1] for index in band_list]
+
+    return(LazyRaster(ds, shape, dtype, source=(file, band_list, 0, 0)))
+
 raster_dtype = {'byte': gdal.GDT_Byte,
                 'cfloat32': gdal.GDT_CFloat32,
                 'cfloat64': gdal.GDT_CFloat64,
@@ -175,7 +1715,105 @@ raster_dtype = {'byte': gdal.GDT_Byte,
                 'uint32': gdal.GDT_UInt32,
                 }
 
-def export(arr, ds, filename='pyrsgis_outFile.tif', dtype='default', bands='all', nodata=-9999, compress=None):
+raster_resampling = {'nearest': gdal.GRIORA_NearestNeighbour,
+                     'bilinear': gdal.GRIORA_Bilinear,
+                     'cubic': gdal.GRIORA_Cubic,
+                     'cubicspline': gdal.GRIORA_CubicSpline,
+                     'lanczos': gdal.GRIORA_Lanczos,
+                     'average': gdal.GRIORA_Average,
+                     'mode': gdal.GRIORA_Mode,
+                     'gauss': gdal.GRIORA_Gauss,
+                     }
+
+# creation options that set the compression level of each method
+compress_level_options = {'DEFLATE': 'ZLEVEL',
+                          'ZSTD': 'ZSTD_LEVEL',
+                          'LZMA': 'LZMA_PRESET',
+                          'JPEG': 'JPEG_QUALITY',
+                          'WEBP': 'WEBP_LEVEL',
+                          }
+
+def _creation_options(compress=None, layout='strip', block_size=None, predictor=None,
+                      compress_level=None, num_threads=None):
+    """
+    GTiff creation options for the given compression and layout. The 'cog'
+    layout is written as a tiled GTiff, which is converted on closing.
+    """
+    options = ['BIGTIFF=IF_SAFER']
+    if layout.lower() in ['tiled', 'cog']:
+        block_size = 256 if block_size is None else int(block_size)
+        options += ['TILED=YES', 'BLOCKXSIZE=%d' % (block_size), 'BLOCKYSIZE=%d' % (block_size)]
+    if compress is not None:
+        options.append('COMPRESS=%s' % (compress))
+        if predictor is not None:
+            options.append('PREDICTOR=%d' % (int(predictor)))
+        if (compress_level is not None) and (compress.upper() in compress_level_options):
+            options.append('%s=%s' % (compress_level_options[compress.upper()], str(compress_level)))
+        if num_threads is not None:
+            options.append('NUM_THREADS=%s' % (str(num_threads).upper()))
+    return(options)
+
+def _cog_options(compress=None, block_size=None, predictor=None, compress_level=None,
+                 num_threads=None, resampling='average'):
+    # the COG driver names some of the options differently from GTiff
+    options = ['BIGTIFF=IF_SAFER', 'BLOCKSIZE=%d' % (512 if block_size is None else int(block_size)),
+               'RESAMPLING=%s' % (resampling.upper())]
+    if compress is not None:
+        options.append('COMPRESS=%s' % (compress))
+        if predictor is not None:
+            options.append('PREDICTOR=%s' % ({1: 'NO', 2: 'STANDARD', 3: 'FLOATING_POINT'}[int(predictor)]))
+        if compress_level is not None:
+            quality = compress.upper() in ['JPEG', 'WEBP']
+            options.append('%s=%s' % ('QUALITY' if quality else 'LEVEL', str(compress_level)))
+    if num_threads is not None:
+        options.append('NUM_THREADS=%s' % (str(num_threads).upper()))
+    return(options)
+
+def _tif_filename(filename):
+    # if given file name does not end with .tif, add it
+    if os.path.splitext(filename)[-1].lower() != '.tif':
+        filename = filename + '.tif'
+    return(filename)
+
+def _create_file(filename, ds, col, row, n_bands, dtype='default', compress=None, options=None):
+    """
+    Create an empty GeoTIFF with the projection and geotransform of the
+    datasource object and return the GDAL dataset, ready to be written.
+    """
+
+    filename = _tif_filename(filename)
+    
+    #If dtype is default and matches with ds, use int16.
+    #If dtype is default and disagrees with ds, use ds datatype.
+    #If a dtype is specified, use that.
+    
+    if (dtype == 'default') and (ds.DataType == raster_dtype['int']):
+        dtype = 'int'
+    elif (dtype == 'default') and (ds.DataType != raster_dtype['int']):
+        dtype = list(raster_dtype.keys())[list(raster_dtype.values()).index(ds.DataType)]
+    else:
+        pass
+
+    if options is None:
+        options = _creation_options(compress=compress)
+
+    driver = gdal.GetDriverByName("GTiff")
+
+    # release any cached handle of the file that is about to be overwritten
+    clear_cache(filename)
+
+    outdata = driver.Create(filename, col, row, n_bands, raster_dtype[dtype.lower()], options=options)
+    outdata.SetGeoTransform(ds.GetGeoTransform())
+    outdata.SetProjection(ds.GetProjection())
+
+    return(outdata)
+
+# the number of exports that can be written in the background at the same time
+_background_slots = threading.BoundedSemaphore(2)
+
+def export(arr, ds, filename='pyrsgis_outFile.tif', dtype='default', bands='all', nodata=-9999, compress=None,
+           overviews=None, resampling='average', layout='strip', block_size=None, predictor=None,
+           compress_level=None, num_threads=None, background=False):
     """
     Export GeoTIFF file
 
@@ -193,9 +1831,11 @@ def export(arr, ds, filename='pyrsgis_outFile.tif', dtype='default', bands='all'
     ds              : datasource object
                       The datasource object of a target reference raster.
                       
-    filename        : string
+    filename        : string or None
                       Output file name ending with '.tif'. This can include
-                      relative path or full path of the file.
+                      relative path or full path of the file. If None, the
+                      GeoTIFF is written in memory and returned as bytes,
+                      see ``pyrsgis.raster.to_bytes``.
                       
     dtype           : string
                       The data type of the raster to be exported. It can take
@@ -223,6 +1863,53 @@ def export(arr, ds, filename='pyrsgis_outFile.tif', dtype='default', bands='all'
                       and other methods that GDAL offers. Compressing the data can save a lot
                       of disk space without losing data. Some methods, for instance 'LZW'
                       can reduce the size of the raster from more than a GB to less than 20 MB.
+
+    overviews       : list, optional
+                      Decimation factors of the overviews (pyramids) to build in the exported
+                      file, for example [2, 4, 8, 16]. Overviews make displaying the raster and
+                      reading it at a coarser resolution (see the ``scale`` parameter of
+                      ``pyrsgis.raster.read``) much faster.
+
+    resampling      : string
+                      The resampling method used to build the overviews. Options are 'nearest',
+                      'average', 'bilinear', 'cubic', 'cubicspline', 'lanczos', 'mode' and 'gauss'.
+
+    layout          : string
+                      Internal organisation of the output file. Options are 'strip' (default),
+                      'tiled' and 'cog'. Tiled files are much faster to read in windows or blocks,
+                      and 'cog' writes a Cloud Optimized GeoTIFF, that is, a tiled file with
+                      overviews that can be read efficiently over HTTP.
+
+    block_size      : integer, optional
+                      Width and height of the tiles for the 'tiled' and 'cog' layouts. Defaults
+                      to 256 for 'tiled' and 512 for 'cog'. Should be a multiple of 16.
+
+    predictor       : integer, optional
+                      The compression predictor, 1 for none, 2 for horizontal differencing
+                      (integer data) and 3 for floating point data. A predictor often reduces the
+                      size of compressed continuous rasters considerably.
+
+    compress_level  : integer, optional
+                      Compression level, for example 1 to 9 for 'DEFLATE' or 1 to 22 for 'ZSTD'.
+                      Higher levels result in smaller files but slower export.
+
+    num_threads     : integer or string, optional
+                      Number of threads to use for compression, or 'ALL_CPUS'.
+
+    background      : boolean
+                      If ``True``, the array is compressed and written on a background
+                      thread and the function returns immediately with a
+                      ``pyrsgis.raster.RasterWriter``. Call its ``result`` method to wait
+                      until the file is written, which also raises any error of the
+                      background thread. The array must not be modified meanwhile. At
+                      most two exports run in the background at a time, a further call
+                      waits until one of them is written, which bounds the memory held
+                      by the arrays waiting to be written.
+
+    Returns
+    -------
+    writer          : RasterWriter
+                      Only if ``background`` is ``True``.
    
     Examples
     --------
@@ -244,29 +1931,49 @@ def export(arr, ds, filename='pyrsgis_outFile.tif', dtype='default', bands='all'
 
     Note that the 'dtype' parameter here is explicitly defined as 'float32'
     since NDVI is a continuous data.
+
+    To build overviews in the exported file, pass the decimation factors:
+
+    >>> raster.export(ndvi_arr, ds, output_file, dtype='float32', overviews=[2, 4, 8, 16])
+
+    Large outputs that will be read in windows later on are best exported as tiled or
+    cloud optimized GeoTIFFs, compressed using all the processors:
+
+    >>> raster.export(ndvi_arr, ds, output_file, dtype='float32', layout='cog', compress='ZSTD',
+    ...               predictor=3, compress_level=9, num_threads='ALL_CPUS')
+
+    To get the GeoTIFF as bytes without writing to the disk, for example to send it
+    over HTTP, leave out the file name:
+
+    >>> tif_bytes = raster.export(ndvi_arr, ds, None, dtype='float32', compress='DEFLATE')
+
+    When processing many scenes in a loop, the compression of one scene can be overlapped
+    with the computation of the next one. The loop waits whenever two scenes are still
+    being written:
+
+    >>> writers = []
+    >>> for input_file, output_file in zip(input_files, output_files):
+    ...     ds, data_arr = raster.read(input_file)
+    ...     ndvi_arr = (data_arr[4, :, :] - data_arr[3, :, :]) / (data_arr[4, :, :] + data_arr[3, :, :])
+    ...     writers.append(raster.export(ndvi_arr, ds, output_file, compress='LZW', background=True))
+    >>> [writer.result() for writer in writers]
     
     """
 
-    # if given file name does not end with .tif, add it
-    if os.path.splitext(filename)[-1].lower() != '.tif':
-        filename = filename + '.tif'
-    
-    #If dtype is default and matches with ds, use int16.
-    #If dtype is default and disagrees with ds, use ds datatype.
-    #If a dtype is specified, use that.
-    
-    if (dtype == 'default') and (ds.DataType == raster_dtype['int']):
-        dtype = 'int'
-    elif (dtype == 'default') and (ds.DataType != raster_dtype['int']):
-        dtype = list(raster_dtype.keys())[list(raster_dtype.values()).index(ds.DataType)]
-    else:
-        pass
+    if filename is None:
+        path = _vsimem_path()
+        export(arr, ds, path, dtype=dtype, bands=bands, nodata=nodata, compress=compress,
+               overviews=overviews, resampling=resampling, layout=layout, block_size=block_size,
+               predictor=predictor, compress_level=compress_level, num_threads=num_threads)
+        return(_vsimem_bytes(path))
 
     if len(arr.shape) == 3:
         layers, row, col = arr.shape
     elif len(arr.shape) == 2:
         row, col = arr.shape
         layers = 1
+        # a single band is handled as a stack of one, so that bands select whole grids
+        arr = arr[np.newaxis, :, :]
 
     if type(bands) == type('all'):
         if bands.lower() == 'all':
@@ -282,31 +1989,93 @@ def export(arr, ds, filename='pyrsgis_outFile.tif', dtype='default', bands='all'
          type(bands) == type(tuple()):
         nBands = len(bands)
         outBands = bands
-    driver = gdal.GetDriverByName("GTiff")
 
-    if compress == None:
-        outdata = driver.Create(filename, col, row, nBands, raster_dtype[dtype.lower()])
-    else:
-        outdata = driver.Create(filename, col, row, nBands, raster_dtype[dtype.lower()], options=['COMPRESS=%s'%(compress)])
-    outdata.SetGeoTransform(ds.GetGeoTransform())
-    outdata.SetProjection(ds.GetProjection())
+    # select the bands as a view where possible, so that no copy is made
     if type(bands) == type(1):
-        if layers > 1:
-            outdata.GetRasterBand(nBands).WriteArray(arr[bands-1, :, :])
-            outdata.GetRasterBand(nBands).SetNoDataValue(nodata)
+        out_arr = arr[bands-1, :, :] if layers > 1 else arr[0]
+    elif type(bands) == type('all'):
+        out_arr = arr
+    else:
+        out_arr = _band_view(arr, outBands)
+        if out_arr is None:
+            out_arr = arr[[bandNumber-1 for bandNumber in outBands], :, :]
+
+    # only a few exports run in the background at a time, further calls wait
+    # for one of them to finish, which bounds the arrays held in memory
+    slot = _background_slots if background else None
+    if slot is not None:
+        slot.acquire()
+    try:
+        writer = RasterWriter(filename, _window_ds(ds, (0, 0, col, row)), dtype=dtype, bands=nBands, nodata=nodata,
+                              compress=compress, overviews=overviews, resampling=resampling, layout=layout,
+                              block_size=block_size, predictor=predictor, compress_level=compress_level,
+                              num_threads=num_threads, background=background)
+    except Exception:
+        if slot is not None:
+            slot.release()
+        raise
+    writer._slot = slot
+    try:
+        writer.write(out_arr)
+    finally:
+        if background:
+            writer._submit_close()
         else:
-            outdata.GetRasterBand(nBands).WriteArray(arr)
-            outdata.GetRasterBand(nBands).SetNoDataValue(nodata)
-    elif (type(bands) == type('all') and bands.lower()=='all') or\
-         type(bands) == type([1, 2, 3])or\
-         type(bands) == type(tuple()):
-        for n, bandNumber in enumerate(outBands):
-            outdata.GetRasterBand(n+1).WriteArray(arr[bandNumber-1,:,:])
-            outdata.GetRasterBand(n+1).SetNoDataValue(nodata)
-    outdata.FlushCache() 
-    outdata = None
+            writer.close()
+    if background:
+        return(writer)
+
+def to_bytes(arr, ds, dtype='default', bands='all', nodata=-9999, compress=None,
+             overviews=None, resampling='average', layout='strip', block_size=None, predictor=None,
+             compress_level=None, num_threads=None):
+    """
+    Export array as GeoTIFF bytes
 
-def north_east(arr, layer='both', flip_north=False, flip_east=False):
+    The function writes the array as a GeoTIFF in the in-memory file system
+    of GDAL (/vsimem/) and returns the contents of the file, so that rasters
+    can be served or uploaded without a temporary file on the disk. The
+    parameters are the same as those of ``pyrsgis.raster.export``.
+
+    Parameters
+    ----------
+    arr             : array
+                      A numpy array to be exported.
+
+    ds              : datasource object
+                      The datasource object of a target reference raster.
+
+    dtype           : string
+                      The data type of the exported raster, see ``pyrsgis.raster.export``.
+
+    bands           : integer, list, tuple or 'all'
+                      The bands to be exported.
+
+    nodata          : signed integer
+                      The value to be treated as NoData.
+
+    compress        : string, optional
+                      The compression algorithm, see ``pyrsgis.raster.export``.
+
+    Returns
+    -------
+    tif_bytes       : bytes
+                      The contents of the GeoTIFF file. These can be read again
+                      using ``pyrsgis.raster.read``.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> ds, data_arr = raster.read(r'E:/path_to_your_file/landsat8_multispectral.tif')
+    >>> tif_bytes = raster.to_bytes(data_arr[4, :, :], ds, compress='DEFLATE')
+    >>> ds, band_arr = raster.read(tif_bytes)
+
+    """
+
+    return(export(arr, ds, None, dtype=dtype, bands=bands, nodata=nodata, compress=compress,
+                  overviews=overviews, resampling=resampling, layout=layout, block_size=block_size,
+                  predictor=predictor, compress_level=compress_level, num_threads=num_threads))
+
+def north_east(arr, layer='both', flip_north=False, flip_east=False, grid='dense', dtype='float64'):
     """
     Generate row and column number arrays
 
@@ -333,6 +2102,18 @@ def north_east(arr, layer='both', flip_north=False, flip_east=False):
                    from right to left instead of left to right, which
                    is the default way.
 
+    grid         : string
+                   Either of these options: 'dense', 'sparse', 'view'. 'dense'
+                   returns full, writeable 2D arrays. 'sparse' returns the
+                   northing as a column of shape (rows, 1) and the easting as a
+                   row of shape (1, cols), which broadcast against 2D arrays in
+                   numpy arithmetic. 'view' returns read-only 2D views of these,
+                   which have the full shape but hardly use any memory.
+
+    dtype        : string or numpy dtype
+                   The data type of the returned arrays, for example 'float32'
+                   to halve the memory of dense arrays.
+
     Returns
     -------
     array(s)     : 2D numpy array(s)
@@ -372,17 +2153,48 @@ def north_east(arr, layer='both', flip_north=False, flip_east=False):
 
     You can again display these new arrays and hover the mouse to check values,
     which will now be different from the default ones.
+
+    For large rasters, the full arrays are often not needed. The 'sparse' grid
+    returns a column and a row that broadcast in numpy arithmetic, and uses a tiny
+    fraction of the memory:
+
+    >>> north_col, east_row = raster.north_east(data_arr, grid='sparse', dtype='float32')
+    >>> print(north_col.shape, east_row.shape)
+    (2054, 1) (1, 2044)
+    >>> distance_arr = np.sqrt(north_col**2 + east_row**2)
     """
         
     if len(arr.shape) > 2 : _, row, col = arr.shape
     if len(arr.shape) == 2 : row, col = arr.shape
 
-    north = np.linspace(1, row, row)
-    east = np.linspace(1, col, col)
-    east, north = np.meshgrid(east, north)
+    return(_north_east_grid(row, col, layer=layer, flip_north=flip_north, flip_east=flip_east,
+                            grid=grid, dtype=dtype))
+
+def _north_east_axes(row, col, flip_north=False, flip_east=False, dtype='float64'):
+    # row and column numbers (starting from 1) as broadcastable column and row vectors
+    north = np.arange(1, row + 1, dtype=dtype).reshape(row, 1)
+    east = np.arange(1, col + 1, dtype=dtype).reshape(1, col)
+
+    if flip_north == True : north = north[::-1, :]
+    if flip_east == True : east = east[:, ::-1]
+
+    return(north, east)
 
-    if flip_north == True : north = np.flip(north, axis=0)
-    if flip_east == True : east = np.flip(east, axis=1)
+def _expand_grid(arrays, shape, grid='dense'):
+    # expand the axis vectors to the requested kind of grid
+    if grid.lower() == 'sparse':
+        return([np.ascontiguousarray(item) for item in arrays])
+    views = [np.broadcast_to(item, shape) for item in arrays]
+    if grid.lower() == 'view':
+        return(views)
+    return([np.array(item) for item in views])
+
+def _north_east_grid(row, col, layer='both', flip_north=False, flip_east=False, grid='dense', dtype='float64'):
+    if grid.lower() not in ['dense', 'sparse', 'view']:
+        print("Invalid grid. Acceptable options are 'dense', 'sparse' and 'view'.")
+        return
+
+    north, east = _expand_grid(_north_east_axes(row, col, flip_north, flip_east, dtype), (row, col), grid)
     
     if layer=='both':
         return(north, east)
@@ -391,7 +2203,7 @@ def north_east(arr, layer='both', flip_north=False, flip_east=False):
     elif layer=='east':
         return(east)
 
-def north_east_coordinates(ds, arr, layer='both'):
+def north_east_coordinates(ds, arr, layer='both', grid='dense', dtype='float64'):
     """
     Generate arrays with cell latitude and longitude value.
 
@@ -410,6 +2222,14 @@ def north_east_coordinates(ds, arr, layer='both'):
     layer        : string
                    Either of these options: 'both', 'north', 'east'
 
+    grid         : string
+                   Either of these options: 'dense', 'sparse', 'view'. This is same as
+                   the ``grid`` parameter of the ``pyrsgis.raster.north_east`` function.
+
+    dtype        : string or numpy dtype
+                   The data type of the returned arrays. The coordinates are computed
+                   in double precision and then converted.
+
     Returns
     -------
     array(s)     : 2D numpy array(s)
@@ -447,15 +2267,26 @@ def north_east_coordinates(ds, arr, layer='both'):
     
     >>> raster.export(north_arr, ds, r'E:/path_to_your_file/northing.tif', dtype='float32')
     >>> raster.export(east_arr, ds, r'E:/path_to_your_file/easting.tif', dtype='float32')
+
+    When the coordinates are only used in arithmetic with other arrays, the 'sparse'
+    grid avoids building the full arrays:
+
+    >>> north_col, east_row = raster.north_east_coordinates(ds, data_arr, grid='sparse')
     
     """
-    
-    if layer.lower() == 'north': north = north_east(arr, layer='north')
-    if layer.lower() == 'east': east = north_east(arr, layer='east')
-    if layer.lower() == 'both': north, east = north_east(arr, layer='both')
 
-    if 'north' in locals().keys(): north = list(ds.GeoTransform)[3] + (north * list(ds.GeoTransform)[-1] - list(ds.GeoTransform)[-1]/2)
-    if 'east' in locals().keys(): east = list(ds.GeoTransform)[0] + (east * list(ds.GeoTransform)[1] - list(ds.GeoTransform)[1]/2)
+    if grid.lower() not in ['dense', 'sparse', 'view']:
+        print("Invalid grid. Acceptable options are 'dense', 'sparse' and 'view'.")
+        return
+
+    if len(arr.shape) > 2 : _, row, col = arr.shape
+    if len(arr.shape) == 2 : row, col = arr.shape
+
+    # the coordinates are computed on the axis vectors only
+    north, east = _north_east_axes(row, col)
+    north = list(ds.GeoTransform)[3] + (north * list(ds.GeoTransform)[-1] - list(ds.GeoTransform)[-1]/2)
+    east = list(ds.GeoTransform)[0] + (east * list(ds.GeoTransform)[1] - list(ds.GeoTransform)[1]/2)
+    north, east = _expand_grid([north.astype(dtype), east.astype(dtype)], (row, col), grid)
         
     if layer=='both':
         return(north, east)
@@ -464,7 +2295,58 @@ def north_east_coordinates(ds, arr, layer='both'):
     elif layer=='east':
         return(east)
     
-def northing(reference_file, outFile='pyrsgis_northing.tif', value='number', flip=True, dtype='int16', compress=None):
+def _axis_block(ds, layer, window, value='number', flip=False):
+    """
+    Generate the cell values of a northing or easting raster for the pixel window
+    (xoff, yoff, xsize, ysize). The values only depend on the row or column number,
+    hence they are computed on a vector and then expanded to the block.
+    """
+    xoff, yoff, xsize, ysize = window
+    geo_transform = list(ds.GeoTransform)
+    if layer == 'north':
+        n_cells, start, size, origin, cell_size = ds.RasterYSize, yoff, ysize, geo_transform[3], geo_transform[-1]
+    else:
+        n_cells, start, size, origin, cell_size = ds.RasterXSize, xoff, xsize, geo_transform[0], geo_transform[1]
+
+    values = np.arange(start + 1, start + size + 1, dtype='float64')
+    if value.lower() == 'coordinates':
+        values = origin + (values * cell_size - cell_size/2)
+    else:
+        if flip == True: values = n_cells + 1 - values
+        if value.lower() == 'normalised': values = (values + 1) / (n_cells + 1)
+
+    values = values.reshape((size, 1) if layer == 'north' else (1, size))
+    return(_expand_grid([values], (ysize, xsize), 'dense')[0])
+
+def _axis_file(reference_file, outfile, layer, value='number', flip=False, dtype='int16', compress=None,
+               block_size=512, workers=1):
+    # write a northing or easting raster block by block as a tiled GeoTIFF
+    ds = read_meta(reference_file)
+    if value.lower() in ['coordinates', 'normalised']:
+        dtype = 'float32'
+
+    windows = _block_windows(ds, (block_size, block_size))
+    with RasterWriter(outfile, ds, dtype=dtype, bands=1, compress=compress, layout='tiled',
+                      block_size=block_size) as writer:
+        if workers == 1:
+            for window in windows:
+                writer.write(_axis_block(ds, layer, window, value, flip), window)
+            return
+
+        # generate the next blocks in parallel while the current one is written
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for window in windows:
+                pending.append((window, executor.submit(_axis_block, ds, layer, window, value, flip)))
+                if len(pending) > 2 * workers:
+                    window, future = pending.popleft()
+                    writer.write(future.result(), window)
+            while len(pending) > 0:
+                window, future = pending.popleft()
+                writer.write(future.result(), window)
+
+def northing(reference_file, outFile='pyrsgis_northing.tif', value='number', flip=True, dtype='int16', compress=None,
+             block_size=512, workers=1):
     """
     Generate northing raster using a reference .tif file
 
@@ -501,6 +2383,14 @@ def northing(reference_file, outFile='pyrsgis_northing.tif', value='number', fli
                       and other methods that GDAL offers. This is same as the ``pyrsgis.raster.export``
                       function.
 
+    block_size       : integer
+                       Size of the tiles of the output file. The raster is generated and
+                       written one tile at a time, so that the memory used does not depend
+                       on the size of the raster.
+
+    workers          : integer
+                       Number of threads used to generate the tiles.
+
     Examples
     --------
     >>> from pyrsgis import raster
@@ -529,24 +2419,11 @@ def northing(reference_file, outFile='pyrsgis_northing.tif', value='number', fli
         
     """
     
-    ds, data_arr = read(reference_file, bands=1)  
-    north = north_east(data_arr, layer='north')
+    _axis_file(reference_file, outFile, 'north', value=value, flip=flip, dtype=dtype, compress=compress,
+               block_size=block_size, workers=workers)
 
-    if value.lower() == 'coordinates':
-        flip = False
-        north = list(ds.GeoTransform)[3] + (north * list(ds.GeoTransform)[-1] - list(ds.GeoTransform)[-1]/2)
-        dtype = 'float32'
-        
-    elif value.lower() == 'normalised':
-        north += 1
-        north /= north.max()
-        dtype = 'float32'
-
-    if flip == True : north = np.flip(north, axis=0)
-
-    export(north, ds, filename=outFile, dtype=dtype, compress=compress)
-
-def easting(reference_file, outfile='pyrsgis_easting.tif', value='number', flip=False, dtype='int16', compress=None):
+def easting(reference_file, outfile='pyrsgis_easting.tif', value='number', flip=False, dtype='int16', compress=None,
+            block_size=512, workers=1):
     """
     Generate easting raster using a reference .tif file
 
@@ -583,6 +2460,14 @@ def easting(reference_file, outfile='pyrsgis_easting.tif', value='number', flip=
                        and other methods that GDAL offers. This is same as the ``pyrsgis.raster.export``
                        function.
 
+    block_size       : integer
+                       Size of the tiles of the output file. The raster is generated and
+                       written one tile at a time, so that the memory used does not depend
+                       on the size of the raster.
+
+    workers          : integer
+                       Number of threads used to generate the tiles.
+
     Examples
     --------
     >>> from pyrsgis import raster
@@ -611,22 +2496,8 @@ def easting(reference_file, outfile='pyrsgis_easting.tif', value='number', flip=
         
     """
     
-    ds, data_arr = read(reference_file, bands=1)
-    east = north_east(data_arr, layer='east')
-
-    if value.lower() == 'coordinates':
-        flip = False
-        east = list(ds.GeoTransform)[0] + (east * list(ds.GeoTransform)[1] - list(ds.GeoTransform)[1]/2)
-        dtype = 'float32'
-    
-    elif value.lower() == 'normalised':
-        east += 1
-        east /= east.max()
-        dtype = 'float32'
-        
-    if flip==True: east = np.flip(east, axis=1)        
-
-    export(east, ds, filename=outfile, dtype=dtype, compress=compress)
+    _axis_file(reference_file, outfile, 'east', value=value, flip=flip, dtype=dtype, compress=compress,
+               block_size=block_size, workers=workers)
     
 def radiometric_correction(arr, pixel_depth=8, return_minmax=False, min_val=None, max_val=None):
     if len(arr.shape) == 3:
@@ -736,7 +2607,7 @@ def shift(ds, x=0, y=0, shift_type='coordinate'):
         print("Invalid shift_type. Acceptable options are " + \
               "'coordinate' and 'cell'. Please see the documentation at %s" % (doc_address))
 
-def shift_file(file, shift_type='coordinate', x=0, y=0, outfile=None, dtype='default'):
+def shift_file(file, shift_type='coordinate', x=0, y=0, outfile=None, dtype='default', inplace=False):
     """
     Shift and export raster file in one go
 
@@ -767,6 +2638,10 @@ def shift_file(file, shift_type='coordinate', x=0, y=0, outfile=None, dtype='def
                    The data type of the output raster. If nothing is passed, the data type is
                    picked from the ``ds`` object.
 
+    inplace      : boolean
+                   If ``True``, the geotransform of the input file itself is updated and no
+                   output file is created.
+
     Examples
     --------
     >>> from pyrsgis import raster
@@ -782,15 +2657,69 @@ def shift_file(file, shift_type='coordinate', x=0, y=0, outfile=None, dtype='def
 
     >>> raster.shift_file(infile, x=10, y=10, outfile=outfile, shift_type='cell')
 
+    Only the georeferencing changes, hence the cells are not read. The input file is
+    copied as it is (keeping its data type and compression) and only the geotransform
+    of the copy is rewritten. If the ``outfile`` ends with '.vrt', a virtual raster
+    pointing to the input file is written instead, which takes no time at all. The
+    cells are only read and exported again if a different ``dtype`` is asked for.
+
+    >>> raster.shift_file(infile, x=10, y=10, outfile=r'E:/path_to_your_file/shifted_file.vrt')
+
+    The geotransform of the input file can also be updated directly:
+
+    >>> raster.shift_file(infile, x=10, y=10, inplace=True)
+
     """
     
-    ds, arr = read(file)
+    ds = read_meta(file)
     out_ds = shift(ds, x, y, shift_type)
+    if out_ds is None:
+        return
+
+    # release the cached handles before the file is modified
+    if inplace:
+        clear_cache(file)
+        src = gdal.Open(file, gdal.GA_Update)
+        if src is None:
+            raise IOError('Could not open %s for update.' % (file))
+        src.SetGeoTransform(out_ds.GeoTransform)
+        src.FlushCache()
+        src = None
+        return
 
     if outfile == None:
         outfile = '%s_shifted.tif' % (os.path.splitext(file)[0])
 
-    export(arr, out_ds, filename=outfile, dtype=dtype)
+    src = _open(file)
+    same_dtype = (dtype == 'default') or (raster_dtype.get(dtype.lower()) == ds.DataType)
+
+    # a virtual raster referring to the input file
+    if os.path.splitext(outfile)[-1].lower() == '.vrt':
+        clear_cache(outfile)
+        out_file = gdal.GetDriverByName('VRT').CreateCopy(outfile, src)
+        if out_file is None:
+            raise IOError('Could not create %s.' % (outfile))
+        out_file.SetGeoTransform(out_ds.GeoTransform)
+        out_file.FlushCache()
+        out_file = None
+
+    # copy the file without decoding the cells and rewrite the geotransform
+    elif same_dtype and (src.GetDriver().ShortName == 'GTiff'):
+        outfile = _tif_filename(outfile)
+        clear_cache(outfile)
+        # CopyFiles returns a non-zero error code if the copy failed
+        if src.GetDriver().CopyFiles(outfile, file):
+            raise IOError('Could not copy %s to %s.' % (file, outfile))
+        out_file = gdal.Open(outfile, gdal.GA_Update)
+        if out_file is None:
+            raise IOError('Could not open %s for update.' % (outfile))
+        out_file.SetGeoTransform(out_ds.GeoTransform)
+        out_file.FlushCache()
+        out_file = None
+
+    else:
+        ds, arr = read(file)
+        export(arr, out_ds, filename=outfile, dtype=dtype)
 
 def clip(ds, data_arr, x_min, x_max, y_min, y_max):
     """
@@ -845,43 +2774,23 @@ def clip(ds, data_arr, x_min, x_max, y_min, y_max):
     given bounding box. The raster can now easily be exported.
 
     >>> raster.export(clipped_arr, new_ds, r'E:/path_to_your_file/clipped_file.tif')
+
+    Cells that fall completely inside the bounding box are kept. The clipped array is
+    a view of the input array, which is not modified. Copy it if it should not share
+    memory with the input array.
     
     """
-    
-    # if array is multiband, take the first band
-    temp_array = data_arr[0, :, :] if len(data_arr.shape) == 3 else data_arr
-    
-    north, east = north_east_coordinates(ds, temp_array, layer='both')
-
-    # make values beyond the lat long zero
-    temp_array[north < (y_min - ds.cell_ysize/2)] = 0
-    temp_array[north > (y_max + ds.cell_ysize/2)] = 0
-    temp_array[east < (x_min + ds.cell_xsize/2)] = 0
-    temp_array[east > (x_max - ds.cell_xsize/2)] = 0
-
-    # get the bouding box and clip the array
-    non_zero_index = np.nonzero(temp_array)
-    row_min, row_max = non_zero_index[0].min(), non_zero_index[0].max()+1
-    col_min, col_max = non_zero_index[1].min(), non_zero_index[1].max()+1
 
-    # modify the metadata
-    north = north[row_min:row_max, col_min:col_max]
-    east = east[row_min:row_max, col_min:col_max]
-    #print(north.shape, east.shape)
-    #print(north.min(), east.max())
+    # the window is computed from the geotransform, no coordinate grids are needed
+    window = _window_from_bbox(ds, [[x_min, y_min], [x_max, y_max]])
+    if not _valid_window(ds, window):
+        print("The bounding box does not contain any cell of the raster. Raster extent is %s." % (str(ds.bbox)))
+        return(None, None)
 
-    geo_transform = list(ds.GeoTransform)
-    geo_transform[3] = north.max() - (ds.GeoTransform[-1] / 2)
-    geo_transform[0] = east.min() - (ds.GeoTransform[1] / 2)
-    out_ds = deepcopy(ds)
-    out_ds.GeoTransform = tuple(geo_transform)
-    out_ds.RasterYSize, out_ds.RasterXSize = north.shape
-    out_ds.update_bbox()
+    col_min, row_min, xsize, ysize = window
+    out_ds = _window_ds(ds, window)
 
-    if len(data_arr.shape) == 3:
-        return(out_ds, data_arr[:, row_min:row_max, col_min:col_max])
-    else:
-        return(out_ds, data_arr[row_min:row_max, col_min:col_max])
+    return(out_ds, data_arr[..., row_min:row_min+ysize, col_min:col_min+xsize])
 
 def clip_file(file, x_min, x_max, y_min, y_max, outfile=None):
     """
@@ -923,18 +2832,45 @@ def clip_file(file, x_min, x_max, y_min, y_max, outfile=None):
     clip, you may want to first read the raster file, plot and find your area of interest
     and check the bounding box of the input raster. To do so, please check the
     ``pyrsgis.raster.clip`` function.
+
+    Only the clipped region is read from the input file, so small regions can be
+    clipped quickly from very large rasters.
     
     """
     
-    ds, array = read(file)
-
-    ds, array = clip(ds, array, x_min, x_max, y_min, y_max)
+    ds, array = read(file, bbox=[[x_min, y_min], [x_max, y_max]])
+    if array is None:
+        return
     
     if outfile == None:
         outfile = '%s_clipped.tif' % (os.path.splitext(file)[0])
     
     export(array, ds, filename=outfile, bands='all')
 
+def _keep_mask(arr, remove):
+    # cells that should not be trimmed away
+    if type(remove) == type('negative'):
+        if remove.lower() == 'negative':
+            return(arr >= 0)
+        return(np.ones(arr.shape, dtype=bool))
+    return(arr != remove)
+
+def _extent_from_any(rows_any, cols_any):
+    """
+    Convert the per-row and per-column "any cell to keep" flags to the
+    smallest pixel window (xoff, yoff, xsize, ysize) containing all of them.
+    Returns None if there is nothing to keep.
+    """
+    rows, cols = np.flatnonzero(rows_any), np.flatnonzero(cols_any)
+    if len(rows) == 0:
+        return(None)
+    return(int(cols[0]), int(rows[0]), int(cols[-1] - cols[0] + 1), int(rows[-1] - rows[0] + 1))
+
+def _trim_window(data_arr, remove):
+    # the first band decides the extent of a multiband array
+    keep = _keep_mask(data_arr[0, :, :] if len(data_arr.shape) == 3 else data_arr, remove)
+    return(_extent_from_any(keep.any(axis=1), keep.any(axis=0)))
+
 def trim_array(data_arr, remove='negative', return_clip_index=False):
     """
     Trim raster array to remove NoData value at the edge
@@ -986,26 +2922,24 @@ def trim_array(data_arr, remove='negative', return_clip_index=False):
     option for the ``remove`` parameter will treat negative values as unnecessary. It should be noted
     that cells within the 'meaningful' region of the raster that have value same as the ``remove`` value
     will remain unaffected by the trimming process.
+
+    The trimmed array is a view of the input array. For a 3D array, the first band decides
+    the extent of the trimmed array.
     
     """
-    
-    out_array = deepcopy(data_arr)
 
-    # remove undesired values
-    if type(remove) == type('negative'):
-        if remove.lower() == 'negative': out_array[out_array < 0] = 0
-    else:
-        out_array[out_array == remove] = 0
+    window = _trim_window(data_arr, remove)
+    if window is None:
+        print('All the cells of the array are to be removed, nothing is left after trimming.')
+        return((None, None) if return_clip_index else None)
 
-    # get the bouding box and clip the array
-    non_zero_index = np.nonzero(out_array)
-    row_min, row_max = non_zero_index[0].min(), non_zero_index[0].max()+1
-    col_min, col_max = non_zero_index[1].min(), non_zero_index[1].max()+1
+    col_min, row_min, xsize, ysize = window
+    col_max, row_max = col_min + xsize, row_min + ysize
 
     if return_clip_index:
-        return data_arr[row_min:row_max, col_min:col_max], [[col_min, row_min], [col_max, row_max]]
+        return data_arr[..., row_min:row_max, col_min:col_max], [[col_min, row_min], [col_max, row_max]]
     else:
-        return data_arr[row_min:row_max, col_min:col_max]
+        return data_arr[..., row_min:row_max, col_min:col_max]
     
 
 def trim(ds, data_arr, remove):
@@ -1069,35 +3003,20 @@ def trim(ds, data_arr, remove):
     
     """
 
-    if len(data_arr.shape) == 2:
-        temp_arr = deepcopy(data_arr)
-    elif len(data_arr.shape) > 2:
-        temp_arr = deepcopy(data_arr[0, :, :])
-    else:
+    if len(data_arr.shape) not in [2, 3]:
         print('Inconsistent shape of array received. Please check!')
+        return(None, None)
 
-    # trim the array using trim function, get the bbox
-    _, bbox = trim_array(temp_arr, remove=remove, return_clip_index=True)
-    [col_min, row_min], [col_max, row_max] = bbox
-
-    # update the dds object by generating north and east rasters
-    north, east = north_east_coordinates(ds, temp_arr, layer='both')
-
-    north = north[row_min:row_max, col_min:col_max]
-    east = east[row_min:row_max, col_min:col_max]
+    # the bbox comes from the first band, the origin from the geotransform
+    window = _trim_window(data_arr, remove)
+    if window is None:
+        print('All the cells of the array are to be removed, nothing is left after trimming.')
+        return(None, None)
 
-    geo_transform = list(ds.GeoTransform)
-    geo_transform[3] = north.max() - (ds.GeoTransform[-1] / 2)
-    geo_transform[0] = east.min() - (ds.GeoTransform[1] / 2)
-    out_ds = deepcopy(ds)
-    out_ds.GeoTransform = tuple(geo_transform)
-    out_ds.RasterYSize, out_ds.RasterXSize = north.shape
-    out_ds.update_bbox()
+    col_min, row_min, xsize, ysize = window
+    out_ds = _window_ds(ds, window)
 
-    if len(data_arr.shape) == 2:
-        return out_ds, data_arr[row_min:row_max, col_min:col_max]
-    elif len(data_arr.shape) > 2:
-        return out_ds, data_arr[:, row_min:row_max, col_min:col_max]
+    return out_ds, data_arr[..., row_min:row_min+ysize, col_min:col_min+xsize]
 
 def trim_file(filename, remove, outfile):
     """
@@ -1141,22 +3060,43 @@ def trim_file(filename, remove, outfile):
     that cells within the 'meaningful' region of the raster that have value same as the ``remove`` value
     will remain unaffected by the trimming process.
 
+    The file is processed block by block in two passes, the first finds the extent to keep
+    and the second copies only that window to the output file. Hence, rasters larger than
+    the available memory can be trimmed.
+
     """
     
-    # read the file
-    ds, data_arr = read(filename)
+    # read the metadata
+    ds = read_meta(filename)
 
     # handle non-georeferenced raster (make y cell size negative)
     if not ds.GeoTransform[-1] < 0:
         corrected_geotransform = list(ds.GeoTransform)
         corrected_geotransform[-1] *= -1
         ds.GeoTransform = tuple(corrected_geotransform)
-        
-    # call trim function
-    new_ds, new_arr = trim(ds, data_arr, remove=remove)
-    
-    # export the outfile
-    export(new_arr, new_ds, outfile)
+        ds.update_bbox()
+
+    # first pass, find the rows and columns that have cells to keep
+    block_shape = _stream_block_shape(_open(filename))
+    rows_any = np.zeros(ds.RasterYSize, dtype=bool)
+    cols_any = np.zeros(ds.RasterXSize, dtype=bool)
+    for (xoff, yoff, xsize, ysize), _, block in iter_blocks(filename, bands=1, block_shape=block_shape):
+        keep = _keep_mask(block, remove)
+        rows_any[yoff:yoff+ysize] |= keep.any(axis=1)
+        cols_any[xoff:xoff+xsize] |= keep.any(axis=0)
+
+    window = _extent_from_any(rows_any, cols_any)
+    if window is None:
+        print('All the cells of the raster are to be removed, nothing is left after trimming.')
+        return
+
+    # second pass, copy the window block by block
+    col_min, row_min, xsize, ysize = window
+    out_ds = _window_ds(ds, window)
+    with RasterWriter(outfile, out_ds) as writer:
+        for xoff, yoff, block_xsize, block_ysize in _block_windows(out_ds, block_shape):
+            _, block = read(filename, window=(col_min + xoff, row_min + yoff, block_xsize, block_ysize))
+            writer.write(block, (xoff, yoff))
 
 # define a function to update datasource object
 def update_ds(ds_object, new_lon, new_lat):
@@ -1201,7 +3141,32 @@ def update_ds(ds_object, new_lon, new_lat):
 
     return new_ds
 
-def fragment_raster(filename, nrows, ncols, outdir=None, prefix=None):
+def _split_edges(n_cells, parts):
+    # edges of ``parts`` nearly equal pieces, the same as np.array_split
+    sizes = [n_cells // parts + (1 if item < n_cells % parts else 0) for item in range(parts)]
+    return([int(item) for item in np.cumsum([0] + sizes)])
+
+def _fragment_windows(ds, nrows=None, ncols=None, tile_size=None, overlap=0):
+    """
+    Generate the (x, y) grid position (starting from 1) and the pixel window of
+    each fragment in row-major order. The windows are grown by ``overlap`` cells
+    on each side, but not beyond the raster.
+    """
+    if tile_size is not None:
+        tile_rows, tile_cols = (tile_size, tile_size) if type(tile_size) == type(1) else tile_size
+        row_edges = list(range(0, ds.RasterYSize, int(tile_rows))) + [ds.RasterYSize]
+        col_edges = list(range(0, ds.RasterXSize, int(tile_cols))) + [ds.RasterXSize]
+    else:
+        row_edges = _split_edges(ds.RasterYSize, int(nrows))
+        col_edges = _split_edges(ds.RasterXSize, int(ncols))
+
+    for y in range(len(row_edges) - 1):
+        for x in range(len(col_edges) - 1):
+            col_min, col_max = max(col_edges[x] - overlap, 0), min(col_edges[x + 1] + overlap, ds.RasterXSize)
+            row_min, row_max = max(row_edges[y] - overlap, 0), min(row_edges[y + 1] + overlap, ds.RasterYSize)
+            yield((x + 1, y + 1), (col_min, row_min, col_max - col_min, row_max - row_min))
+
+def fragment_raster(filename, nrows=None, ncols=None, outdir=None, prefix=None, tile_size=None, overlap=0, workers=1):
     """
     This function clips the raster into smaller rasters using a nxm grid.
 
@@ -1224,6 +3189,18 @@ def fragment_raster(filename, nrows, ncols, outdir=None, prefix=None):
     prefix : string, optional
         If specified, the prefix will be used for clipped rasters files. Otherwise, the input file name will be used.
 
+    tile_size : integer or tuple, optional
+        Size of the fragments in cells, either one number for square fragments or (rows, cols). If given,
+        ``nrows`` and ``ncols`` are ignored and the fragments at the right and bottom edges can be smaller.
+
+    overlap : integer, optional
+        Number of cells by which neighbouring fragments overlap on each side, which is useful when the
+        fragments are processed with neighbourhood operations. Fragments are not extended beyond the raster.
+
+    workers : integer, optional
+        Number of threads used to read and export the fragments. Each fragment is read from the file
+        on its own, so the whole raster is never held in memory.
+
     Returns
     -------
     exported_files_list : list
@@ -1249,8 +3226,17 @@ def fragment_raster(filename, nrows, ncols, outdir=None, prefix=None):
         E:/path_to_output_directory/clipped_images/ClippedSample_2_1.tif
         ...
         E:/path_to_output_directory/clipped_images/ClippedSample_5_3.tif
+
+    Fragments of a fixed size, overlapping by 16 cells, can be exported in parallel:
+
+    .. code-block:: python
+
+        exported_files = raster.fragment_raster(infile, tile_size=1024, overlap=16, outdir=outdir, workers=4)
     """
 
+    if (tile_size is None) and ((nrows is None) or (ncols is None)):
+        print('Please specify either nrows and ncols, or tile_size.')
+        return
 
     # resolve the output file name
     if prefix == None:
@@ -1261,45 +3247,536 @@ def fragment_raster(filename, nrows, ncols, outdir=None, prefix=None):
     if outdir != None:
         outfile = os.path.join(outdir, os.path.split(outfile)[-1])
 
-    # read the raster file
-    ds, arr = read(filename)
+    # the windows and their origins only need the metadata
+    ds = read_meta(filename)
+    fragments = list(_fragment_windows(ds, nrows, ncols, tile_size=tile_size, overlap=int(overlap)))
+
+    def export_fragment(fragment):
+        xy, window = fragment
+        new_ds, data_arr = read(filename, window=window)
+        export_file = outfile.replace('.tif', f'_{xy[0]}_{xy[1]}.tif')
+        export(data_arr, new_ds, filename=export_file)
+        return(export_file)
 
-    # fragment the main data array
-    arr_fragmented = [np.split(item, ncols, axis=-1) for item in np.array_split(arr, nrows, axis=-2)]
-    arr_fragmented = [col_item for row_item in arr_fragmented for col_item in row_item]
+    with ThreadPoolExecutor(max_workers=max(int(workers), 1)) as pool:
+        exported_files_list = list(pool.map(export_fragment, fragments))
 
-    # generate latitude and longitude arrays
-    latitude_arr, longitude_arr = north_east_coordinates(ds, arr, layer='both')
-    arr = None # arr variable no longer required
+    return exported_files_list
+
+def _same_projection(proj_a, proj_b):
+    if proj_a == proj_b:
+        return(True)
+    # the same reference system can be written in different ways
+    srs_a, srs_b = osr.SpatialReference(), osr.SpatialReference()
+    if (srs_a.ImportFromWkt(proj_a) != 0) or (srs_b.ImportFromWkt(proj_b) != 0):
+        return(False)
+    return(bool(srs_a.IsSame(srs_b)))
+
+def _union_ds(dss, files):
+    """
+    Return a datasource object for the grid covering all the given datasource
+    objects. Raises a ValueError naming the file if their projection, cell
+    size or number of bands differ, or if their cells are not aligned.
+    """
+    cell_xsize, cell_ysize = dss[0].GeoTransform[1], dss[0].GeoTransform[5]
+    for file, ds in zip(files, dss):
+        if not _same_projection(ds.Projection, dss[0].Projection):
+            raise ValueError('The projection of %s differs from that of %s.' % (file, files[0]))
+        if (not np.isclose(ds.GeoTransform[1], cell_xsize)) or (not np.isclose(ds.GeoTransform[5], cell_ysize)):
+            raise ValueError('The cell size of %s differs from that of %s.' % (file, files[0]))
+        if (ds.GeoTransform[2] != 0) or (ds.GeoTransform[4] != 0):
+            raise ValueError('%s is rotated, rotated rasters can not be mosaicked.' % (file))
+        if ds.RasterCount != dss[0].RasterCount:
+            raise ValueError('The number of bands of %s differs from that of %s.' % (file, files[0]))
+
+    ul_lon = min([ds.GeoTransform[0] for ds in dss])
+    ul_lat = max([ds.GeoTransform[3] for ds in dss]) if cell_ysize < 0 else min([ds.GeoTransform[3] for ds in dss])
+    lr_lon = max([ds.lr_lon for ds in dss])
+    lr_lat = min([ds.lr_lat for ds in dss]) if cell_ysize < 0 else max([ds.lr_lat for ds in dss])
+
+    out_ds = deepcopy(dss[0])
+    out_ds.GeoTransform = (ul_lon, cell_xsize, 0.0, ul_lat, 0.0, cell_ysize)
+    out_ds.RasterXSize = int(round((lr_lon - ul_lon) / cell_xsize))
+    out_ds.RasterYSize = int(round((lr_lat - ul_lat) / cell_ysize))
+    out_ds.update_bbox()
 
-    # transform the values from cell center to cell upper left corner
-    latitude_arr -= list(ds.GeoTransform)[-1] / 2
-    longitude_arr -= list(ds.GeoTransform)[1] / 2
+    # every file should start at a whole cell of the union grid
+    for file, ds in zip(files, dss):
+        _grid_offset(ds, out_ds, file)
 
-    ## since north and east arrays have redundant cols and rows respectively, slice them
-    latitude_arr = latitude_arr[:, 0]
-    longitude_arr = longitude_arr[0, :]
+    return(out_ds)
 
-    #_fragment latitude and longitude arrays
-    latitude_arr_fragmented = [item[0] for item in np.array_split(latitude_arr, nrows)]
-    longitude_arr_fragmented = [item[0] for item in np.array_split(longitude_arr, ncols)]
+def _grid_offset(ds, out_ds, file):
+    # column and row of the upper left cell of ds in the grid of out_ds
+    col = (ds.GeoTransform[0] - out_ds.GeoTransform[0]) / out_ds.GeoTransform[1]
+    row = (ds.GeoTransform[3] - out_ds.GeoTransform[3]) / out_ds.GeoTransform[5]
+    if (abs(col - round(col)) > 1e-6) or (abs(row - round(row)) > 1e-6):
+        raise ValueError('The cells of %s are not aligned with the other files.' % (file))
+    return(int(round(col)), int(round(row)))
+
+def _block_files(dss, offsets, block_size):
+    """
+    Index the input files by the output blocks they intersect, as a
+    dictionary of (block row, block column) to the list of file numbers, in
+    the order of the files.
+    """
+    index = {}
+    for n, (ds, (col, row)) in enumerate(zip(dss, offsets)):
+        for block_row in range(row // block_size, (row + ds.RasterYSize - 1) // block_size + 1):
+            for block_col in range(col // block_size, (col + ds.RasterXSize - 1) // block_size + 1):
+                index.setdefault((block_row, block_col), []).append(n)
+    return(index)
+
+def _mosaic_block(files, dss, offsets, window, n_bands, method, nodata):
+    """
+    Combine the parts of the input files that fall in the given window of the
+    output grid. The files are opened through the dataset cache, and only
+    over their intersection with the window.
+    """
+    xoff, yoff, xsize, ysize = window
+    out = np.zeros((n_bands, ysize, xsize), dtype='float64')
+    filled = np.zeros(out.shape, dtype=bool)
+    count = np.zeros(out.shape, dtype='int32') if method == 'mean' else None
+
+    for file, ds, (col, row) in zip(files, dss, offsets):
+        # intersection of the file with the window, in output cells
+        col_min, col_max = max(xoff, col), min(xoff + xsize, col + ds.RasterXSize)
+        row_min, row_max = max(yoff, row), min(yoff + ysize, row + ds.RasterYSize)
+        if (col_min >= col_max) or (row_min >= row_max):
+            continue
+
+        src = _open(file)
+        if src is None:
+            raise IOError('Could not open %s.' % (file))
+        arr = _extract_bands(src, 'all', window=(col_min - col, row_min - row, col_max - col_min, row_max - row_min))
+        arr = arr.reshape((n_bands, row_max - row_min, col_max - col_min))
+        valid = (arr != nodata) & ~np.isnan(arr) if arr.dtype.kind in 'fc' else (arr != nodata)
+
+        index = (slice(None), slice(row_min - yoff, row_max - yoff), slice(col_min - xoff, col_max - xoff))
+        part, part_filled = out[index], filled[index]
+        if method == 'first':
+            update = valid & ~part_filled
+        elif method == 'last':
+            update = valid
+        elif method == 'max':
+            update = valid & (~part_filled | (arr > part))
+        elif method == 'min':
+            update = valid & (~part_filled | (arr < part))
+        else:
+            part[valid] += arr[valid]
+            count[index][valid] += 1
+            update = np.zeros(valid.shape, dtype=bool)
+        part[update] = arr[update]
+        part_filled |= valid
 
-    # combine latitudes and longitudes to easily loop over them later
-    coordinates_fragmented = [(lat, lon) for lat in latitude_arr_fragmented for lon in longitude_arr_fragmented]
+    if method == 'mean':
+        out[filled] /= count[filled]
+    out[~filled] = nodata
 
-    # create x and 7 numbers to use as suffix during file export
-    x_list = np.arange(1, ncols + 1)
-    y_list = np.arange(1, nrows + 1)
-    xy_list = [(y, x) for y in y_list for x in x_list]
+    return(out)
 
-    # loop through the fragmented arrays and export the raster files
-    exported_files_list = []
-    for xy, location, data_arr in zip(xy_list, coordinates_fragmented, arr_fragmented):
-        new_ds = update_ds(ds, location[1], location[0])
+def mosaic(files, outfile='pyrsgis_mosaic.tif', method='first', nodata=-9999, dtype='default', compress=None,
+           block_size=512):
+    """
+    Mosaic raster files
 
-        export_file = outfile.replace('.tif', f'_{xy[1]}_{xy[0]}.tif')
-        export(data_arr, new_ds,filename = export_file)
-        exported_files_list.append(export_file)
+    This function combines several raster files, for example the fragments created by
+    ``pyrsgis.raster.fragment_raster`` or tiled model predictions, into one raster that
+    covers all of them. The files should have the same projection, cell size and number
+    of bands, and their cells should be aligned, otherwise a ValueError is raised. The
+    output is written block by block, and only the parts of the input files that fall
+    in a block are read, hence the mosaic is never held in memory as a whole.
 
-    return exported_files_list
+    Parameters
+    ----------
+    files           : list
+                      A list of paths to the input raster files.
+
+    outfile         : string
+                      Path to the output file. If it ends with '.vrt', a virtual raster
+                      that refers to the input files is written instead, which is
+                      instant, but only supports the 'first' and 'last' methods.
+
+    method          : string
+                      How to combine the cells where the files overlap. Options are
+                      'first' and 'last' (the value from the first or last file in the
+                      list), 'mean', 'min' and 'max'.
+
+    nodata          : signed integer
+                      The NoData value. Cells of the input files with this value are
+                      ignored, and cells covered by no file get this value.
+
+    dtype           : string
+                      The data type of the output raster, same as in ``pyrsgis.raster.export``.
+                      The 'default' type is that of the first file, or 'float32' for the
+                      'mean' method.
+
+    compress        : string, optional
+                      Compression type of the output raster, for example 'LZW' or 'DEFLATE'.
+
+    block_size      : integer
+                      Size of the tiles of the output file, which are processed one at a time.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> tiles = raster.fragment_raster(r'E:/path_to_your_file/your_file.tif', tile_size=1024, overlap=32)
+    >>> predictions = [predict_file(tile) for tile in tiles]
+    >>> raster.mosaic(predictions, r'E:/path_to_your_file/prediction.tif', method='mean', compress='DEFLATE')
+
+    A virtual mosaic can be created instantly and read like any other raster:
+
+    >>> raster.mosaic(tiles, r'E:/path_to_your_file/mosaic.vrt')
+    >>> ds, data_arr = raster.read(r'E:/path_to_your_file/mosaic.vrt')
+
+    """
+
+    method = method.lower()
+    if method not in ['first', 'last', 'mean', 'min', 'max']:
+        print("Invalid method. Acceptable options are 'first', 'last', 'mean', 'min' and 'max'.")
+        return
+
+    files = list(files)
+    dss = [read_meta(file) for file in files]
+    out_ds = _union_ds(dss, files)
+
+    # a virtual mosaic, GDAL takes the value from the last file where they overlap
+    if os.path.splitext(outfile)[-1].lower() == '.vrt':
+        if method not in ['first', 'last']:
+            print("A virtual mosaic only supports the 'first' and 'last' methods.")
+            return
+        clear_cache(outfile)
+        vrt = gdal.BuildVRT(outfile, list(files)[::-1] if method == 'first' else list(files),
+                            srcNodata=nodata, VRTNodata=nodata)
+        vrt.FlushCache()
+        vrt = None
+        return
+
+    if (dtype == 'default') and (method == 'mean'):
+        dtype = 'float32'
+    offsets = [_grid_offset(ds, out_ds, file) for file, ds in zip(files, dss)]
+
+    # only the files that intersect a block are opened for it, and the open
+    # handles are bounded by the dataset cache, whatever the number of files
+    block_files = _block_files(dss, offsets, block_size)
+    with RasterWriter(outfile, out_ds, dtype=dtype, nodata=nodata, compress=compress, layout='tiled',
+                      block_size=block_size) as writer:
+        for window in _block_windows(out_ds, (block_size, block_size)):
+            numbers = block_files.get((window[1] // block_size, window[0] // block_size), [])
+            writer.write(_mosaic_block([files[n] for n in numbers], [dss[n] for n in numbers],
+                                       [offsets[n] for n in numbers], window, out_ds.RasterCount,
+                                       method, nodata), window)
+
+def stack(files, outfile=None):
+    """
+    Stack single band files as one multiband raster
+
+    This function builds a GDAL virtual raster (VRT) in which every input file is
+    one band, for example the separate band files of a Landsat or Sentinel scene.
+    The VRT only refers to the input files, hence creating it costs nothing and
+    the cells are only read when ``pyrsgis.raster.read``, ``pyrsgis.raster.iter_blocks``,
+    ``pyrsgis.raster.open`` etc. ask for them, exactly like a multiband GeoTIFF.
+
+    Parameters
+    ----------
+    files           : list
+                      Paths to the input files, in the order of the bands. The first
+                      band of each file is used.
+
+    outfile         : string, optional
+                      Path to the output file, ideally with a '.vrt' extension. If not
+                      given, the VRT is kept in memory and its XML description is
+                      returned instead, which can be passed to the reading functions
+                      in place of a file name.
+
+    Returns
+    -------
+    stacked_file    : string
+                      The path to the VRT file, or its XML description if no ``outfile``
+                      was given.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> band_files = [r'E:/path_to_your_file/LC08_B%d.TIF' % (n) for n in range(1, 8)]
+    >>> scene = raster.stack(band_files)
+    >>> ds, data_arr = raster.read(scene, workers=4)
+    >>> print(data_arr.shape)
+    (7, 2054, 2044)
+
+    Only the required bands, windows or blocks are read from the band files:
+
+    >>> ds, nir_red = raster.read(scene, bands=[5, 4], window=(0, 0, 512, 512))
+    >>> for window, ds, arr in raster.iter_blocks(scene, block_shape=(512, 512)):
+    ...     pass
+
+    The stack can also be saved to use it later, or in any GIS software:
+
+    >>> raster.stack(band_files, r'E:/path_to_your_file/LC08_stack.vrt')
+
+    """
+
+    path = _vsimem_path('.vrt') if outfile is None else outfile
+
+    # an in-memory VRT can not refer to files relative to itself
+    if outfile is None:
+        files = [os.path.abspath(file) if os.path.exists(file) else file for file in files]
+
+    clear_cache(path)
+    vrt = gdal.BuildVRT(path, list(files), separate=True)
+    if vrt is None:
+        print('The files could not be stacked. Please check that they exist and have the same projection.')
+        return
+    vrt.FlushCache()
+    vrt = None
+
+    if outfile is not None:
+        return(outfile)
+    return(_vsimem_bytes(path).decode('utf-8'))
+
+def _rebin(hist, values_min, values_upper):
+    """
+    Fit a histogram, given as [lower edge, bin width, counts], to the values
+    from values_min up to the edge values_upper. The lower edge moves to the
+    old bin holding values_min and the bin width is multiplied by the smallest
+    power of two that covers the span, so the old counts are merged without
+    any loss and the span never exceeds about twice the range of the values.
+    """
+    lower, width, counts = hist
+    n_bins = len(counts)
+    first = int(math.floor((values_min - lower) / width))
+    last = max(int(math.ceil((values_upper - lower) / width)) - 1, first)
+
+    factor = 1
+    while n_bins * factor < last - first + 1:
+        factor *= 2
+    if factor == 1 and first == 0:
+        return(hist)
+
+    # the old bins outside the values seen so far are empty
+    index = (np.arange(n_bins) - first) // factor
+    keep = (index >= 0) & (index < n_bins)
+    counts = np.bincount(index[keep], weights=counts[keep], minlength=n_bins)
+    return([lower + first * width, width * factor, counts])
+
+def _hist_add(hist, values, weights=None):
+    n_bins = len(hist[2])
+    index = np.clip(np.floor((values - hist[0]) / hist[1]), 0, n_bins - 1).astype('int64')
+    hist[2] += np.bincount(index, weights=weights, minlength=n_bins)
+
+def _band_stats(file, band, n_bins, nodata):
+    # one pass over the blocks of a band, in the thread that calls it
+    src = _open(file)
+    band_nodata = src.GetRasterBand(band).GetNoDataValue() if nodata is None else nodata
+    is_integer = np.issubdtype(utils.datatype_dict_num_np[src.GetRasterBand(band).DataType], np.integer)
+
+    count, mean, m2 = 0, 0.0, 0.0
+    values_min, values_max = None, None
+    hist = None
+    constant_counts = OrderedDict()
+    for window in _block_windows(src, _stream_block_shape(src)):
+        values = _extract_bands(src, band, window=window).ravel()
+        valid = ~np.isnan(values) if values.dtype.kind == 'f' else np.ones(values.shape, dtype=bool)
+        if band_nodata is not None:
+            valid &= values != band_nodata
+        values = values[valid].astype('float64')
+        if len(values) == 0:
+            continue
+
+        # exact moments, combined block by block (Chan et al.)
+        block_min, block_max = values.min(), values.max()
+        block_count, block_mean = len(values), values.mean()
+        block_m2 = ((values - block_mean) ** 2).sum()
+        delta = block_mean - mean
+        total = count + block_count
+        mean += delta * block_count / total
+        m2 += block_m2 + delta ** 2 * count * block_count / total
+        count = total
+        values_min = block_min if values_min is None else min(values_min, block_min)
+        values_max = block_max if values_max is None else max(values_max, block_max)
+
+        # an integer value v fills the interval [v, v + 1)
+        values_upper = values_max + 1 if is_integer else values_max
+
+        # the bin width can only be chosen once the values have a range,
+        # until then the blocks are constant and only their counts are kept
+        if hist is None:
+            if values_max == values_min:
+                constant_counts[block_min] = constant_counts.get(block_min, 0) + block_count
+                continue
+            width = (values_upper - values_min) / n_bins
+            width = max(int(math.ceil(width)), 1) if is_integer else width
+            hist = [values_min, float(width), np.zeros(n_bins)]
+            if len(constant_counts) > 0:
+                _hist_add(hist, np.array(list(constant_counts.keys())), np.array(list(constant_counts.values()), dtype='float64'))
+
+        hist = _rebin(hist, values_min, values_upper)
+        _hist_add(hist, values)
+
+    if count == 0:
+        return({'count': 0, 'min': None, 'max': None, 'mean': None, 'std': None,
+                'histogram': [], 'bin_edges': []})
+
+    # all the cells have the same value
+    if hist is None:
+        hist = [values_min, 1.0, np.zeros(n_bins)]
+        hist[2][0] = count
+
+    return({'count': int(count), 'min': float(values_min), 'max': float(values_max),
+            'mean': float(mean), 'std': float(math.sqrt(m2 / count)),
+            'histogram': [int(item) for item in hist[2]],
+            'bin_edges': [float(hist[0] + item * hist[1]) for item in range(n_bins + 1)],
+            'integer': bool(is_integer and hist[1] == 1)})
+
+def _hist_percentile(band_stats, percentile):
+    """
+    Percentile estimated from the histogram, interpolating within the bin. For
+    integer bands with a bin width of 1, the percentile is exact.
+    """
+    counts = np.asarray(band_stats['histogram'], dtype='float64')
+    edges = band_stats['bin_edges']
+    target = percentile / 100.0 * band_stats['count']
+    cumulative = np.cumsum(counts)
+    n = min(int(np.searchsorted(cumulative, target)), len(counts) - 1)
+    if band_stats['integer']:
+        value = edges[n]
+    else:
+        before = cumulative[n] - counts[n]
+        fraction = (target - before) / counts[n] if counts[n] > 0 else 0
+        value = edges[n] + fraction * (edges[n + 1] - edges[n])
+    return(float(min(max(value, band_stats['min']), band_stats['max'])))
+
+def _stats_sidecar(file):
+    return('%s.pyrsgis_stats.json' % (file))
+
+def _load_stats(file):
+    # cached statistics are only valid for the same version of the file
+    try:
+        stat = os.stat(file)
+        with io.open(_stats_sidecar(file), 'r') as sidecar:
+            cached = json.load(sidecar)
+        if (cached['mtime_ns'] != stat.st_mtime_ns) or (cached['size'] != stat.st_size):
+            return({})
+        return(cached['entries'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return({})
+
+def _save_stats(file, entries):
+    try:
+        stat = os.stat(file)
+        entries = dict(_load_stats(file), **entries)
+        with io.open(_stats_sidecar(file), 'w') as sidecar:
+            json.dump({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'entries': entries}, sidecar)
+    except OSError:
+        # the cache is optional, for example the folder may be read-only
+        pass
+
+def stats(file, bands='all', percentiles=[2, 98], histogram_bins=1024, nodata=None, workers=None, cache=True,
+          member=None):
+    """
+    Compute band statistics of a raster file
+
+    The function computes the minimum, maximum, mean, standard deviation, percentiles
+    and histogram of the bands of a raster file in one pass over its blocks, so that
+    rasters larger than the available memory can be summarised. The bands are processed
+    in parallel. The minimum, maximum, mean and standard deviation are exact, the
+    percentiles are estimated from the histogram (exact for integer bands with a
+    range smaller than ``histogram_bins``). The results are saved in a small sidecar
+    file next to the raster, so that repeated calls return instantly until the raster
+    is modified.
+
+    Parameters
+    ----------
+    file            : string
+                      Path to the input file.
+
+    bands           : integer, tuple, list or 'all'
+                      Bands to compute the statistics for.
+
+    percentiles     : list
+                      The percentiles to estimate, between 0 and 100.
+
+    histogram_bins  : integer
+                      Number of bins of the histogram, at least 2. More bins give more
+                      precise percentiles.
+
+    nodata          : number, optional
+                      Cells with this value are ignored. If not given, the NoData value of
+                      each band is used. NaN cells are always ignored.
+
+    workers         : integer, optional
+                      Number of threads, by default one per band.
+
+    cache           : boolean
+                      Whether to use and update the sidecar file with the cached statistics.
+                      It is named after the raster file with a '.pyrsgis_stats.json' suffix.
 
+    member          : string, optional
+                      The path of the raster inside the archive, if ``file`` is a zip
+                      or tar archive. This is same as in ``pyrsgis.raster.read``. The
+                      statistics are then cached in the sidecar file of the archive.
+
+    Returns
+    -------
+    band_stats      : dict
+                      A dictionary with the band numbers as keys, and a dictionary of
+                      'count', 'min', 'max', 'mean', 'std', 'percentiles', 'histogram' and
+                      'bin_edges' for each band.
+
+    Examples
+    --------
+    >>> from pyrsgis import raster
+    >>> input_file = r'E:/path_to_your_file/landsat8_multispectral.tif'
+    >>> band_stats = raster.stats(input_file, percentiles=[2, 50, 98])
+    >>> print(band_stats[4]['mean'], band_stats[4]['percentiles'][98])
+
+    The percentiles can be used, for example, to stretch the bands for display:
+
+    >>> ds, data_arr = raster.read(input_file, bands=4)
+    >>> low, high = band_stats[4]['percentiles'][2], band_stats[4]['percentiles'][98]
+    >>> stretched_arr = np.clip((data_arr - low) / (high - low), 0, 1)
+
+    """
+
+    if int(histogram_bins) < 2:
+        raise ValueError('histogram_bins should be at least 2, got %s.' % (str(histogram_bins)))
+
+    # the statistics of a raster inside an archive are cached next to the archive
+    cache_file = file
+    if member is not None:
+        file = _archive_file(file, member)
+        if file is None:
+            return
+
+    ds = read_meta(file)
+    if not _valid_bands(bands):
+        print("Inappropriate bands selection. Please use the following arguments:\n1) bands = 'all'\n2) bands = [2, 3, 4]\n3) bands = 2")
+        return
+    band_list = _band_list(ds, bands)
+
+    # only the bands missing from the sidecar are computed
+    keys = dict([(band, json.dumps([band, int(histogram_bins), nodata] + ([member] if member is not None else [])))
+                 for band in band_list])
+    cached = _load_stats(cache_file) if cache else {}
+    missing = [band for band in band_list if keys[band] not in cached]
+
+    def band_result(band):
+        return(_band_stats(file, band, int(histogram_bins), nodata))
+
+    if len(missing) > 0:
+        workers = len(missing) if workers is None else max(int(workers), 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            computed = dict(zip([keys[band] for band in missing], pool.map(band_result, missing)))
+        cached = dict(cached, **computed)
+        if cache:
+            _save_stats(cache_file, computed)
+
+    band_stats = OrderedDict()
+    for band in band_list:
+        result = dict(cached[keys[band]])
+        result['percentiles'] = OrderedDict([(item, _hist_percentile(result, item) if result['count'] > 0 else None)
+                                             for item in percentiles])
+        result.pop('integer', None)
+        band_stats[band] = result
+
+    return(band_stats)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for pyrsgis package
+"""
+
+''' Tests for pyrsgis.convert
+
+Naming rules:
+1. class: Test{filename}{Class}{method} with appropriate camel case
+2. function: test_{method}_t{test_id}
+Notes on how to test:
+0. Make sure [pytest](https://docs.pytest.org) has been installed: `pip install pytest`
+1. execute `pytest {file_path}` in terminal to perform all tests in the specified file
+2. for more details, see https://docs.pytest.org/en/stable/usage.html
+'''
+
+import os, tarfile, zipfile
+from pyrsgis import raster, convert
+import numpy as np
+import pandas as pd
+
+# define all the file paths to run the test on
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+MULTIBAND_FILEPATH = f'{DATA_DIR}/raster_multiband.tif'
+SINGLEBAND_DISCRETE_FILEPATH = f'{DATA_DIR}/raster_singleband_discrete.tif'
+SINGLEBAND_CONTINUOUS_FILEPATH = f'{DATA_DIR}/raster_singleband_continuous.tif'
+
+class TestPyrsgisConvertRasterToCsv:
+    ''' Test for convert.raster_to_csv '''
+
+    def test_raster_to_csv_archive_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        archive = str(tmp_path / 'scene.zip')
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.write(SINGLEBAND_DISCRETE_FILEPATH, 'B4.TIF')
+            zip_file.write(SINGLEBAND_DISCRETE_FILEPATH, 'bands/B5.tiff')
+            zip_file.writestr('MTL.txt', 'metadata')
+
+        outfile = str(tmp_path / 'scene.csv')
+        convert.raster_to_csv(archive, filename=outfile)
+        data_df = pd.read_csv(outfile)
+
+        assert sorted(data_df.columns) == ['B4.TIF@1', 'B5.tiff@1']
+        assert np.array_equal(data_df['B5.tiff@1'].values, np.ravel(arr))
+
+    def test_raster_to_csv_member_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        archive = str(tmp_path / 'scene.tar')
+        with tarfile.open(archive, 'w') as tar_file:
+            tar_file.add(MULTIBAND_FILEPATH, 'multiband.tif')
+            tar_file.add(SINGLEBAND_DISCRETE_FILEPATH, 'discrete.tif')
+
+        outfile = str(tmp_path / 'scene.csv')
+        convert.raster_to_csv(archive, filename=outfile, member='multiband.tif')
+        data_df = pd.read_csv(outfile)
+
+        assert list(data_df.columns) == ['multiband.tif@%d' % (n + 1) for n in range(ds.RasterCount)]
+        assert np.array_equal(data_df.values.T, arr.reshape((ds.RasterCount, -1)))
+
+class TestPyrsgisConvertCsvToRaster:
+    ''' Test for convert.csv_to_raster '''
+
+    def test_csv_to_raster_ref_member_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        archive = str(tmp_path / 'reference.zip')
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.write(SINGLEBAND_CONTINUOUS_FILEPATH, 'reference.tif')
+
+        csvfile = str(tmp_path / 'values.csv')
+        pd.DataFrame({'value': np.ravel(arr)}).to_csv(csvfile, index=False)
+        outfile = str(tmp_path / 'values.tif')
+        convert.csv_to_raster(csvfile, archive, filename=outfile, dtype='float32', ref_member='reference.tif')
+
+        ds_out, arr_out = raster.read(outfile)
+        assert ds_out.GeoTransform == ds.GeoTransform
+        assert np.allclose(arr_out, arr)
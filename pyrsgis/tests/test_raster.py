@@ -20,10 +20,11 @@ Notes on how to test:
 '''
 
 #import pytest
-import os
+import io, os, json, math, tarfile, threading, zipfile
 from pyrsgis import raster
 import numpy as np
 import pytest
+from osgeo import gdal
 
 # define all the file paths to run the test on
 DATA_DIR = 'data/'
@@ -55,5 +56,701 @@ class TestPyrsgisRaster:
         ds_singleband_continuous, arr_singleband_continuous = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
         assert type(arr_singleband_continuous) == type(np.array())
 
+class TestPyrsgisRasterWindow:
+    ''' Test for windowed reads in raster.read '''
+
+    def test_read_window_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        ds_win, arr_win = raster.read(MULTIBAND_FILEPATH, window=(3, 2, 10, 7))
+
+        assert arr_win.shape == (ds.RasterCount, 7, 10)
+        assert np.array_equal(arr_win, arr[:, 2:9, 3:13])
+        assert (ds_win.RasterXSize, ds_win.RasterYSize) == (10, 7)
+        assert ds_win.GeoTransform[0] == ds.GeoTransform[0] + 3 * ds.GeoTransform[1]
+        assert ds_win.GeoTransform[3] == ds.GeoTransform[3] + 2 * ds.GeoTransform[5]
+
+    def test_read_bbox_t0(self):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        ds_win, arr_win = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH, window=(4, 5, 6, 8))
+        ds_box, arr_box = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH, bbox=ds_win.bbox)
+
+        assert np.array_equal(arr_box, arr_win)
+        assert ds_box.GeoTransform == ds_win.GeoTransform
+
+class TestPyrsgisRasterIterBlocks:
+    ''' Test for raster.iter_blocks '''
+
+    def test_iter_blocks_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        out_arr = np.zeros_like(arr)
+
+        for (xoff, yoff, xsize, ysize), block_ds, block in raster.iter_blocks(MULTIBAND_FILEPATH, block_shape=(16, 16)):
+            assert block.shape == (ds.RasterCount, ysize, xsize)
+            assert (block_ds.RasterXSize, block_ds.RasterYSize) == (xsize, ysize)
+            out_arr[:, yoff:yoff+ysize, xoff:xoff+xsize] = block
+
+        assert np.array_equal(out_arr, arr)
+
+    def test_iter_blocks_halo_t0(self):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+
+        for (xoff, yoff, xsize, ysize), block_ds, block in raster.iter_blocks(SINGLEBAND_CONTINUOUS_FILEPATH, block_shape=(10, 10), halo=2):
+            assert block.shape == (ysize + 4, xsize + 4)
+            assert np.array_equal(block[2:-2, 2:-2], arr[yoff:yoff+ysize, xoff:xoff+xsize])
+
+    def test_iter_blocks_prefetch_t0(self):
+        timings = {}
+        blocks = list(raster.iter_blocks(MULTIBAND_FILEPATH, block_shape=(8, 8)))
+        prefetched = list(raster.iter_blocks(MULTIBAND_FILEPATH, block_shape=(8, 8), prefetch=3, timings=timings))
+
+        assert [item[0] for item in prefetched] == [item[0] for item in blocks]
+        assert all(np.array_equal(a[2], b[2]) for a, b in zip(blocks, prefetched))
+        assert timings['blocks'] == len(blocks)
+        assert timings['wait'] >= 0
+
+class TestPyrsgisRasterMmap:
+    ''' Test for memory-mapped reads in raster.read '''
+
+    def test_read_mmap_t0(self):
+        for filepath in [MULTIBAND_FILEPATH, SINGLEBAND_CONTINUOUS_FILEPATH]:
+            ds, arr = raster.read(filepath)
+            ds_mm, arr_mm = raster.read(filepath, mmap=True)
+            assert np.array_equal(arr_mm, arr)
+            # a mapped view of the file is read-only, unlike the arrays read by GDAL
+            assert arr.flags.writeable and not arr_mm.flags.writeable
+
+            ds_mm, arr_mm = raster.read(filepath, bands=1, window=(2, 3, 5, 4), mmap=True)
+            arr_band = arr[0] if len(arr.shape) == 3 else arr
+            assert np.array_equal(arr_mm, arr_band[3:7, 2:7])
+
+    def test_read_mmap_band_t0(self):
+        # a band that does not exist fails the same way with and without mmap
+        with pytest.raises(Exception) as gdal_error:
+            raster.read(SINGLEBAND_CONTINUOUS_FILEPATH, bands=2)
+        with pytest.raises(gdal_error.type):
+            raster.read(SINGLEBAND_CONTINUOUS_FILEPATH, bands=2, mmap=True)
+
+class TestPyrsgisRasterReadMeta:
+    ''' Test for raster.read_meta '''
+
+    def test_read_meta_t0(self):
+        for filepath in [MULTIBAND_FILEPATH, SINGLEBAND_DISCRETE_FILEPATH]:
+            ds, arr = raster.read(filepath)
+            ds_meta = raster.read_meta(filepath)
+
+            assert ds_meta.GeoTransform == ds.GeoTransform
+            assert ds_meta.Projection == ds.Projection
+            assert (ds_meta.RasterCount, ds_meta.RasterYSize, ds_meta.RasterXSize) ==\
+                   (ds.RasterCount, ds.RasterYSize, ds.RasterXSize)
+            assert ds_meta.dtypes == ds.dtypes
+
+            assert raster.read(filepath, bands=None)[1] is None
+
+class TestPyrsgisRasterCache:
+    ''' Test for the dataset cache used by raster.read '''
+
+    def test_cache_t0(self):
+        raster.clear_cache()
+        ds, arr_band1 = raster.read(MULTIBAND_FILEPATH, bands=1)
+        ds, arr_band2 = raster.read(MULTIBAND_FILEPATH, bands=2)
+
+        info = raster.cache_info()
+        assert (info['hits'], info['misses'], info['currsize']) == (1, 1, 1)
+
+        raster.clear_cache(MULTIBAND_FILEPATH)
+        assert raster.cache_info()['currsize'] == 0
+
+    def test_cache_workers_t0(self):
+        # the handles of the worker threads do not evict that of the caller
+        raster.clear_cache()
+        raster.read(MULTIBAND_FILEPATH, bands=1)
+        raster.read(MULTIBAND_FILEPATH, workers=4)
+        assert raster.cache_info()['currsize'] == 1
+
+        hits = raster.cache_info()['hits']
+        raster.read(MULTIBAND_FILEPATH, bands=2)
+        assert raster.cache_info()['hits'] == hits + 1
+
+class TestPyrsgisRasterExtractBands:
+    ''' Test for band subset reads in raster.read '''
+
+    def test_read_bands_dtype_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        ds, arr_subset = raster.read(MULTIBAND_FILEPATH, bands=[1, 3])
+
+        assert arr_subset.dtype == arr.dtype
+        assert np.array_equal(arr_subset, arr[[0, 2], :, :])
+
+    def test_read_bands_out_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH, bands=[2, 3])
+        buffer = np.empty(arr.shape, dtype=arr.dtype)
+        _, arr_out = raster.read(MULTIBAND_FILEPATH, bands=[2, 3], out=buffer)
+
+        assert arr_out is buffer
+        assert np.array_equal(buffer, arr)
+
+class TestPyrsgisRasterParallel:
+    ''' Test for threaded reads in raster.read and raster.read_many '''
+
+    def test_read_workers_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        ds_par, arr_par = raster.read(MULTIBAND_FILEPATH, workers=4)
+
+        assert arr_par.dtype == arr.dtype
+        assert np.array_equal(arr_par, arr)
+
+    def test_read_many_t0(self):
+        filepaths = [MULTIBAND_FILEPATH, SINGLEBAND_DISCRETE_FILEPATH, SINGLEBAND_CONTINUOUS_FILEPATH]
+        results = raster.read_many(filepaths, workers=3)
+
+        assert len(results) == len(filepaths)
+        for filepath, (ds, arr) in zip(filepaths, results):
+            assert np.array_equal(arr, raster.read(filepath)[1])
+
+class TestPyrsgisRasterOverviews:
+    ''' Test for overview building in raster.export and overview reads in raster.read '''
+
+    def test_overviews_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        outfile = str(tmp_path / 'overviews.tif')
+        raster.export(arr, ds, outfile, dtype='float32', overviews=[2, 4])
+
+        ds_ovr, arr_ovr = raster.read(outfile, overview_level=1)
+        assert arr_ovr.shape == (ds_ovr.RasterYSize, ds_ovr.RasterXSize)
+        assert ds_ovr.RasterXSize == int(math.ceil(ds.RasterXSize / 4))
+        assert np.isclose(ds_ovr.lr_lon, ds.lr_lon) and np.isclose(ds_ovr.lr_lat, ds.lr_lat)
+
+    def test_read_scale_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        ds_scaled, arr_scaled = raster.read(MULTIBAND_FILEPATH, scale=0.5)
+
+        assert arr_scaled.shape == (ds.RasterCount, round(ds.RasterYSize / 2), round(ds.RasterXSize / 2))
+        assert np.isclose(ds_scaled.GeoTransform[1], ds.GeoTransform[1] * ds.RasterXSize / ds_scaled.RasterXSize)
+
+class TestPyrsgisRasterLazyRaster:
+    ''' Test for raster.open and raster.LazyRaster '''
+
+    def test_lazy_compute_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        img = raster.open(MULTIBAND_FILEPATH)
+        assert img.shape == arr.shape
+
+        band_a, band_b = img[0].astype('float32'), img[1].astype('float32')
+        ratio = (band_b - band_a) / (band_b + band_a + 1)
+        expected = (arr[1].astype('float32') - arr[0]) / (arr[1].astype('float32') + arr[0] + 1)
+
+        assert ratio.shape == expected.shape and ratio.dtype == expected.dtype
+        assert np.allclose(ratio.compute(max_memory=4096), expected)
+        assert np.allclose(ratio[5:15, 2:12].compute(), expected[5:15, 2:12])
+
+    def test_lazy_grid_t0(self):
+        # operands of the same shape from different windows are not on the same grid
+        img = raster.open(MULTIBAND_FILEPATH)
+        with pytest.raises(ValueError):
+            img[0, 0:10, 0:10] + img[0, 5:15, 0:10]
+        with pytest.raises(ValueError):
+            img[:, 0:10, 0:10] * img[0, 0:10, 3:13]
+        assert (img[:, 0:10, 0:10] * img[0, 0:10, 0:10]).shape == (img.shape[0], 10, 10)
+
+    def test_lazy_to_file_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        outfile = str(tmp_path / 'lazy.tif')
+        (raster.open(SINGLEBAND_CONTINUOUS_FILEPATH).astype('float32') * 2).to_file(outfile, max_memory=4096)
+
+        ds_out, arr_out = raster.read(outfile)
+        assert ds_out.GeoTransform == ds.GeoTransform
+        assert np.allclose(arr_out, arr.astype('float32') * 2)
+
+class TestPyrsgisRasterWriter:
+    ''' Test for raster.RasterWriter '''
+
+    def test_writer_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        outfile = str(tmp_path / 'writer.tif')
+
+        # write the blocks in reverse order to check that the order does not matter
+        blocks = list(raster.iter_blocks(MULTIBAND_FILEPATH, block_shape=(16, 16)))
+        with raster.RasterWriter(outfile, ds, nodata=0) as writer:
+            for window, block_ds, block in reversed(blocks):
+                writer.write(block, window)
+
+        ds_out, arr_out = raster.read(outfile)
+        assert ds_out.GeoTransform == ds.GeoTransform
+        assert np.array_equal(arr_out, arr)
+
+    def test_writer_window_t0(self, tmp_path):
+        ds = raster.read_meta(SINGLEBAND_CONTINUOUS_FILEPATH)
+        with raster.RasterWriter(str(tmp_path / 'writer.tif'), ds) as writer:
+            with pytest.raises(ValueError):
+                writer.write(np.zeros((4, 4)), (ds.RasterXSize - 2, 0, 4, 4))
+
+class TestPyrsgisRasterExportLayout:
+    ''' Test for tiled and cloud optimized exports in raster.export '''
+
+    def test_export_tiled_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        outfile = str(tmp_path / 'tiled.tif')
+        raster.export(arr, ds, outfile, layout='tiled', block_size=32, compress='DEFLATE',
+                      predictor=2, compress_level=6, num_threads=2)
+
+        assert gdal.Open(outfile).GetRasterBand(1).GetBlockSize() == [32, 32]
+        assert np.array_equal(raster.read(outfile)[1], arr)
+
+    def test_export_cog_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        outfile = str(tmp_path / 'cog.tif')
+        raster.export(arr, ds, outfile, dtype='float32', layout='cog', compress='ZSTD')
+
+        assert os.listdir(str(tmp_path)) == ['cog.tif']
+        assert gdal.Open(outfile).GetMetadataItem('LAYOUT', 'IMAGE_STRUCTURE') == 'COG'
+        assert np.allclose(raster.read(outfile)[1], arr)
+
+    def test_export_band_subset_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        outfile = str(tmp_path / 'subset.tif')
+        raster.export(arr, ds, outfile, bands=[3, 2, 1])
+
+        assert np.shares_memory(raster._band_view(arr, [3, 2, 1]), arr)
+        assert raster._band_view(arr, [1, 2, 4]) is None
+        assert np.array_equal(raster.read(outfile)[1], arr[[2, 1, 0]])
+
+    def test_export_single_band_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        for bands in [[1], (1,)]:
+            outfile = str(tmp_path / 'single.tif')
+            raster.export(arr, ds, outfile, bands=bands)
+
+            assert np.array_equal(raster.read(outfile)[1], arr)
+        with pytest.raises(IndexError):
+            raster.export(arr, ds, str(tmp_path / 'missing.tif'), bands=[2])
+
+    def test_export_clamp_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        nodata = np.full(arr.shape, -9999, dtype='int64')
+        for dtype in ['byte', 'uint16']:
+            outfile = str(tmp_path / ('%s.tif' % (dtype)))
+            raster.export(nodata, ds, outfile, dtype=dtype)
+
+            assert np.all(raster.read(outfile)[1] == 0)
+
+    def test_export_dtype_t0(self, tmp_path):
+        # types that GDAL can not take directly are converted band by band
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        for dtype in ['>i4', 'int64']:
+            outfile = str(tmp_path / 'converted.tif')
+            raster.export(arr.astype(dtype), ds, outfile, dtype='int32')
+
+            assert np.array_equal(raster.read(outfile)[1], arr)
+
+class TestPyrsgisRasterBytes:
+    ''' Test for in-memory export and reading from bytes '''
+
+    def test_to_bytes_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        tif_bytes = raster.to_bytes(arr, ds, compress='DEFLATE')
+
+        assert isinstance(tif_bytes, bytes)
+        assert np.array_equal(raster.read(tif_bytes)[1], arr)
+        assert np.array_equal(raster.read(io.BytesIO(tif_bytes), bands=2)[1], arr[1])
+
+    def test_export_none_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        with open(SINGLEBAND_DISCRETE_FILEPATH, 'rb') as src:
+            ds_bytes, arr_bytes = raster.read(src)
+
+        assert ds_bytes.GeoTransform == ds.GeoTransform
+        assert np.array_equal(arr_bytes, arr)
+        assert raster.export(arr, ds, None)[:2] in (b'II', b'MM')
+
+class TestPyrsgisRasterBackgroundWriter:
+    ''' Test for the write-behind mode of raster.export and RasterWriter '''
+
+    def test_export_background_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        outfile = str(tmp_path / 'background.tif')
+        writer = raster.export(arr, ds, outfile, compress='LZW', background=True)
+
+        assert writer.result() == outfile
+        assert np.array_equal(raster.read(outfile)[1], arr)
+
+    def test_export_background_bound_t0(self, tmp_path, monkeypatch):
+        # with one slot, a second background export waits for the first one
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        written, submitted = threading.Event(), threading.Event()
+        write_block = raster._write_block
+        def slow_write(*args):
+            written.wait(10)
+            write_block(*args)
+        monkeypatch.setattr(raster, '_write_block', slow_write)
+        monkeypatch.setattr(raster, '_background_slots', threading.BoundedSemaphore(1))
+
+        first = raster.export(arr, ds, str(tmp_path / 'first.tif'), background=True)
+        writers = []
+        def submit():
+            writers.append(raster.export(arr, ds, str(tmp_path / 'second.tif'), background=True))
+            submitted.set()
+        thread = threading.Thread(target=submit)
+        thread.start()
+        assert not submitted.wait(0.5)
+
+        written.set()
+        first.result()
+        thread.join(10)
+        assert submitted.is_set()
+        assert np.array_equal(raster.read(writers[0].result())[1], arr)
+
+    def test_writer_background_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        outfile = str(tmp_path / 'blocks.tif')
+        with raster.RasterWriter(outfile, ds, background=True, queue_size=1) as writer:
+            for window, block_ds, block in raster.iter_blocks(MULTIBAND_FILEPATH, block_shape=(16, 16)):
+                writer.write(block, window)
+
+        assert np.array_equal(raster.read(outfile)[1], arr)
+
+    def test_writer_background_error_t0(self, tmp_path, monkeypatch):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        def failing_write(*args):
+            raise RuntimeError('write failed')
+        monkeypatch.setattr(raster, '_write_block', failing_write)
+        writer = raster.RasterWriter(str(tmp_path / 'error.tif'), ds, background=True)
+        writer.write(arr)
+
+        with pytest.raises(RuntimeError):
+            writer.close()
+
+class TestPyrsgisRasterClip:
+    ''' Test for raster.clip and raster.clip_file '''
+
+    def test_clip_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        arr_copy = arr.copy()
+        x_min, cell_xsize, _, y_max, _, cell_ysize = ds.GeoTransform
+        clip_ds, clipped = raster.clip(ds, arr, x_min=x_min + 3 * cell_xsize, x_max=x_min + 9 * cell_xsize,
+                                       y_min=y_max + 12 * cell_ysize, y_max=y_max + 2 * cell_ysize)
+
+        assert np.shares_memory(clipped, arr)
+        assert np.array_equal(clipped, arr[:, 2:12, 3:9])
+        assert np.array_equal(arr, arr_copy)
+        assert (clip_ds.RasterXSize, clip_ds.RasterYSize) == (6, 10)
+
+    def test_clip_file_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        x_min, cell_xsize, _, y_max, _, cell_ysize = ds.GeoTransform
+        outfile = str(tmp_path / 'clipped.tif')
+        raster.clip_file(SINGLEBAND_DISCRETE_FILEPATH, x_min=x_min + 5 * cell_xsize, x_max=x_min + 15 * cell_xsize,
+                         y_min=y_max + 20 * cell_ysize, y_max=y_max + 4 * cell_ysize, outfile=outfile)
+
+        assert np.array_equal(raster.read(outfile)[1], arr[4:20, 5:15])
+
+class TestPyrsgisRasterTrim:
+    ''' Test for raster.trim_array, raster.trim and raster.trim_file '''
+
+    def padded_file(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        padded = np.full(arr.shape, -9999, dtype='int16')
+        padded[:, 5:17, 3:11] = arr[:, 5:17, 3:11]
+        padded[:, 5, 3] = 0
+        infile = str(tmp_path / 'padded.tif')
+        raster.export(padded, ds, infile, dtype='int16')
+        return(ds, padded, infile)
+
+    def test_trim_t0(self, tmp_path):
+        ds, padded, infile = self.padded_file(tmp_path)
+        trimmed, bbox = raster.trim_array(padded[0], remove=-9999, return_clip_index=True)
+        trim_ds, trimmed_3d = raster.trim(ds, padded, remove=-9999)
+
+        assert bbox == [[3, 5], [11, 17]]
+        assert np.shares_memory(trimmed, padded)
+        assert np.array_equal(trimmed_3d, padded[:, 5:17, 3:11])
+        assert trim_ds.GeoTransform[0] == ds.GeoTransform[0] + 3 * ds.GeoTransform[1]
+        assert trim_ds.GeoTransform[3] == ds.GeoTransform[3] + 5 * ds.GeoTransform[5]
+
+    def test_trim_file_t0(self, tmp_path):
+        ds, padded, infile = self.padded_file(tmp_path)
+        outfile = str(tmp_path / 'trimmed.tif')
+        raster.trim_file(infile, -9999, outfile)
+
+        trim_ds, trimmed = raster.read(outfile)
+        assert np.array_equal(trimmed, padded[:, 5:17, 3:11])
+        assert trim_ds.GeoTransform[0] == ds.GeoTransform[0] + 3 * ds.GeoTransform[1]
+
+class TestPyrsgisRasterNorthEast:
+    ''' Test for the grid options of raster.north_east and raster.north_east_coordinates '''
+
+    def test_north_east_grid_t0(self):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        north, east = raster.north_east(arr)
+        north_col, east_row = raster.north_east(arr, grid='sparse', dtype='float32')
+        north_view, east_view = raster.north_east(arr, grid='view')
+
+        assert north_col.shape == (ds.RasterYSize, 1) and east_row.shape == (1, ds.RasterXSize)
+        assert north_col.dtype == np.float32
+        assert np.array_equal(north_col + 0 * east_row, north)
+        assert np.array_equal(east_view, east) and not east_view.flags.writeable
+
+    def test_north_east_coordinates_grid_t0(self):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        north, east = raster.north_east_coordinates(ds, arr)
+        north_col, east_row = raster.north_east_coordinates(ds, arr, grid='sparse')
+
+        assert np.array_equal(np.broadcast_to(north_col, north.shape), north)
+        assert np.array_equal(np.broadcast_to(east_row, east.shape), east)
+
+class TestPyrsgisRasterNorthingEasting:
+    ''' Test for the block-wise generation in raster.northing and raster.easting '''
+
+    def test_northing_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        outfile = str(tmp_path / 'northing.tif')
+        raster.northing(SINGLEBAND_CONTINUOUS_FILEPATH, outfile, flip=True, block_size=16, workers=2)
+
+        north = raster.north_east(arr, layer='north', flip_north=True)
+        assert gdal.Open(outfile).GetRasterBand(1).GetBlockSize() == [16, 16]
+        assert np.array_equal(raster.read(outfile)[1], north)
+
+    def test_easting_coordinates_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        outfile = str(tmp_path / 'easting.tif')
+        raster.easting(SINGLEBAND_CONTINUOUS_FILEPATH, outfile, value='coordinates', block_size=16)
+
+        east = raster.north_east_coordinates(ds, arr, layer='east', dtype='float32')
+        assert np.array_equal(raster.read(outfile)[1], east)
+
+class TestPyrsgisRasterShiftFile:
+    ''' Test for the metadata-only raster.shift_file '''
+
+    def test_shift_file_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        outfile = str(tmp_path / 'shifted.tif')
+        raster.shift_file(MULTIBAND_FILEPATH, x=10, y=-20, outfile=outfile)
+
+        shift_ds, shift_arr = raster.read(outfile)
+        assert shift_ds.GeoTransform[0] == ds.GeoTransform[0] + 10
+        assert shift_ds.GeoTransform[3] == ds.GeoTransform[3] - 20
+        assert shift_ds.dtypes == ds.dtypes
+        assert np.array_equal(shift_arr, arr)
+
+    def test_shift_file_vrt_inplace_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        vrtfile = str(tmp_path / 'shifted.vrt')
+        raster.shift_file(SINGLEBAND_DISCRETE_FILEPATH, x=2, y=2, outfile=vrtfile, shift_type='cell')
+        assert raster.read_meta(vrtfile).GeoTransform[0] == ds.GeoTransform[0] + 2 * ds.GeoTransform[1]
+
+        infile = str(tmp_path / 'copy.tif')
+        raster.export(arr, ds, infile)
+        raster.shift_file(infile, x=10, inplace=True)
+        assert raster.read_meta(infile).GeoTransform[0] == ds.GeoTransform[0] + 10
+        assert np.array_equal(raster.read(infile)[1], arr)
+
+    def test_shift_file_error_t0(self, tmp_path):
+        # the folder of the output file does not exist
+        for outfile in ['shifted.tif', 'shifted.vrt']:
+            with pytest.raises((IOError, RuntimeError)):
+                raster.shift_file(MULTIBAND_FILEPATH, x=10, outfile=str(tmp_path / 'missing' / outfile))
+
+class TestPyrsgisRasterFragment:
+    ''' Test for the window-based raster.fragment_raster '''
+
+    def test_fragment_raster_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        files = raster.fragment_raster(MULTIBAND_FILEPATH, nrows=2, ncols=3, outdir=str(tmp_path),
+                                       prefix='fragment', workers=3)
+
+        assert len(files) == 6
+        top_left = np.array_split(np.array_split(arr, 2, axis=-2)[0], 3, axis=-1)[0]
+        assert np.array_equal(raster.read(files[0])[1], top_left)
+        assert raster.read_meta(files[0]).GeoTransform == ds.GeoTransform
+
+    def test_fragment_raster_tile_size_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        files = raster.fragment_raster(SINGLEBAND_CONTINUOUS_FILEPATH, tile_size=16, overlap=2,
+                                       outdir=str(tmp_path), prefix='tile')
+
+        frag_ds, frag_arr = raster.read(files[1])
+        assert np.array_equal(frag_arr, arr[0:18, 14:32])
+        assert frag_ds.GeoTransform[0] == ds.GeoTransform[0] + 14 * ds.GeoTransform[1]
+
+class TestPyrsgisRasterMosaic:
+    ''' Test for raster.mosaic '''
+
+    def test_mosaic_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        files = raster.fragment_raster(MULTIBAND_FILEPATH, tile_size=16, overlap=3, outdir=str(tmp_path), prefix='tile')
+
+        for method in ['first', 'mean', 'max']:
+            outfile = str(tmp_path / ('mosaic_%s.tif' % method))
+            raster.mosaic(files, outfile, method=method, block_size=16)
+            mosaic_ds, mosaic_arr = raster.read(outfile)
+            assert mosaic_ds.GeoTransform == ds.GeoTransform
+            assert np.array_equal(mosaic_arr, arr)
+
+    def test_mosaic_vrt_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        files = raster.fragment_raster(SINGLEBAND_DISCRETE_FILEPATH, nrows=2, ncols=2, outdir=str(tmp_path), prefix='part')
+        outfile = str(tmp_path / 'mosaic.vrt')
+        raster.mosaic(files, outfile)
+
+        assert np.array_equal(raster.read(outfile)[1], arr)
+
+    def test_mosaic_many_t0(self, tmp_path):
+        # more files than the dataset cache holds, the open handles stay bounded
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        files = raster.fragment_raster(SINGLEBAND_DISCRETE_FILEPATH, tile_size=8, outdir=str(tmp_path), prefix='tile')
+        raster.set_cache_size(2)
+        try:
+            outfile = str(tmp_path / 'mosaic.tif')
+            raster.mosaic(files, outfile, block_size=16)
+            assert raster.cache_info()['currsize'] <= 2
+        finally:
+            raster.set_cache_size(8)
+
+        assert len(files) > 2
+        assert np.array_equal(raster.read(outfile)[1], arr)
+
+    def test_mosaic_grid_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        files = [str(tmp_path / 'left.tif'), str(tmp_path / 'shifted.tif'), str(tmp_path / 'coarse.tif')]
+        raster.export(arr, ds, files[0])
+        shifted_ds, coarse_ds = raster.read_meta(files[0]), raster.read_meta(files[0])
+        gt = ds.GeoTransform
+        shifted_ds.GeoTransform = (gt[0] + gt[1] * 2.5, gt[1], 0.0, gt[3], 0.0, gt[5])
+        coarse_ds.GeoTransform = (gt[0], gt[1] * 2, 0.0, gt[3], 0.0, gt[5] * 2)
+        raster.export(arr, shifted_ds, files[1])
+        raster.export(arr, coarse_ds, files[2])
+
+        for other in files[1:]:
+            with pytest.raises(ValueError):
+                raster.mosaic([files[0], other], str(tmp_path / 'mosaic.tif'))
+
+class TestPyrsgisRasterStack:
+    ''' Test for the virtual band stacks of raster.stack '''
+
+    def band_files(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        files = []
+        for n in range(ds.RasterCount):
+            files.append(str(tmp_path / ('band_%d.tif' % (n + 1))))
+            raster.export(arr, ds, files[-1], bands=n + 1)
+        return(arr, files)
+
+    def test_stack_t0(self, tmp_path):
+        arr, files = self.band_files(tmp_path)
+        scene = raster.stack(files)
+
+        assert np.array_equal(raster.read(scene)[1], arr)
+        assert np.array_equal(raster.read(scene, bands=[3, 1], workers=2)[1], arr[[2, 0]])
+        for (xoff, yoff, xsize, ysize), block_ds, block in raster.iter_blocks(scene, block_shape=(16, 16)):
+            assert np.array_equal(block, arr[:, yoff:yoff+ysize, xoff:xoff+xsize])
+
+    def test_stack_file_t0(self, tmp_path):
+        arr, files = self.band_files(tmp_path)
+        outfile = raster.stack(files, str(tmp_path / 'stack.vrt'))
+
+        assert raster.read_meta(outfile).RasterCount == len(files)
+        assert np.array_equal(raster.read(outfile)[1], arr)
+
+class TestPyrsgisRasterArchive:
+    ''' Test for reading rasters from zip and tar archives '''
+
+    def test_read_zip_member_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        archive = str(tmp_path / 'scene.zip')
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.write(MULTIBAND_FILEPATH, 'bands/multiband.tif')
+
+        assert raster.archive_members(archive) == ['bands/multiband.tif']
+        assert raster.read_meta(archive, member='bands/multiband.tif').GeoTransform == ds.GeoTransform
+        assert np.array_equal(raster.read(archive, member='bands/multiband.tif')[1], arr)
+
+    def test_read_tar_member_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_DISCRETE_FILEPATH)
+        archive = str(tmp_path / 'scene.tar')
+        with tarfile.open(archive, 'w') as tar_file:
+            tar_file.add(SINGLEBAND_DISCRETE_FILEPATH, 'B4.TIF')
+
+        assert np.array_equal(raster.read(archive, member='B4.TIF', window=(2, 3, 5, 5))[1], arr[3:8, 2:7])
+
+    def test_archive_member_functions_t0(self, tmp_path):
+        # the functions that take a path also take a raster inside an archive
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        archive = str(tmp_path / 'scene.zip')
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            zip_file.write(MULTIBAND_FILEPATH, 'multiband.tif')
+
+        for (xoff, yoff, xsize, ysize), block_ds, block in raster.iter_blocks(archive, block_shape=(16, 16),
+                                                                             prefetch=2, member='multiband.tif'):
+            assert np.array_equal(block, arr[:, yoff:yoff+ysize, xoff:xoff+xsize])
+
+        img = raster.open(archive, bands=[1, 2], member='multiband.tif')
+        assert np.array_equal((img[0] + img[1]).compute(), arr[0] + arr[1])
+
+        band_stats = raster.stats(archive, bands=1, member='multiband.tif')
+        assert band_stats[1]['max'] == arr[0].max()
+        assert os.path.exists(archive + '.pyrsgis_stats.json')
+        assert raster.stats(archive, bands=1, member='multiband.tif') == band_stats
+
+class TestPyrsgisRasterStats:
+    ''' Test for raster.stats '''
+
+    def test_stats_t0(self, tmp_path):
+        ds, arr = raster.read(MULTIBAND_FILEPATH)
+        infile = str(tmp_path / 'multiband.tif')
+        raster.export(arr, ds, infile)
+        band_stats = raster.stats(infile, percentiles=[2, 50, 98], cache=False)
+
+        assert list(band_stats.keys()) == list(range(1, ds.RasterCount + 1))
+        for band, result in band_stats.items():
+            values = arr[band - 1].astype('float64')
+            assert result['count'] == values.size
+            assert result['min'] == values.min() and result['max'] == values.max()
+            assert math.isclose(result['mean'], values.mean())
+            assert math.isclose(result['std'], values.std())
+            assert sum(result['histogram']) == values.size
+            if result['max'] - result['min'] < 1024:
+                assert result['percentiles'][50] == np.percentile(values, 50, method='inverted_cdf')
+
+    def test_stats_cache_t0(self, tmp_path):
+        ds, arr = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        infile = str(tmp_path / 'continuous.tif')
+        raster.export(arr, ds, infile, dtype='float32')
+        band_stats = raster.stats(infile, bands=1)
+
+        assert os.path.exists(infile + '.pyrsgis_stats.json')
+        assert raster.stats(infile, bands=1) == band_stats
+        assert math.isclose(band_stats[1]['mean'], arr[arr != -9999].astype('float64').mean(), rel_tol=1e-6)
+
+        # a second call is answered from the sidecar, not from the file
+        with io.open(infile + '.pyrsgis_stats.json', 'r') as sidecar:
+            cached = json.load(sidecar)
+        for entry in cached['entries'].values():
+            entry['mean'] = 12345.0
+        with io.open(infile + '.pyrsgis_stats.json', 'w') as sidecar:
+            json.dump(cached, sidecar)
+        assert raster.stats(infile, bands=1)[1]['mean'] == 12345.0
+        assert raster.stats(infile, bands=1, cache=False) == band_stats
+
+    def test_stats_constant_block_t0(self, tmp_path, monkeypatch):
+        # the first block holds a single value, the rest spreads over [0, 0.5)
+        arr = np.random.RandomState(0).uniform(0, 0.5, (64, 64)).astype('float32')
+        arr[:4, :] = 0.25
+        ds, _ = raster.read(SINGLEBAND_CONTINUOUS_FILEPATH)
+        ds.RasterXSize, ds.RasterYSize = 64, 64
+        infile = str(tmp_path / 'constant.tif')
+        raster.export(arr, ds, infile, dtype='float32')
+
+        monkeypatch.setattr(raster, '_stream_block_shape', lambda src: (4, src.RasterXSize))
+        result = raster.stats(infile, percentiles=[2, 50, 98], histogram_bins=256, cache=False)[1]
+        width = result['bin_edges'][1] - result['bin_edges'][0]
+
+        assert result['bin_edges'][-1] - result['bin_edges'][0] <= 2 * (result['max'] - result['min'])
+        assert sum(result['histogram']) == arr.size
+        for percentile in [2, 50, 98]:
+            assert abs(result['percentiles'][percentile] - np.percentile(arr, percentile)) <= 2 * width
+
+    def test_stats_bins_t0(self):
+        with pytest.raises(ValueError):
+            raster.stats(SINGLEBAND_CONTINUOUS_FILEPATH, histogram_bins=1, cache=False)
+
 # call the modules in the class and run the tests
 TestPyrsgisRaster().test_init_t0()
\ No newline at end of file
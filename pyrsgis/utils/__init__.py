@@ -1,5 +1,7 @@
 # pyrsgis/utils
 
+import numpy as np
+
 # safely import gdal (support old version)
 try:
     import gdal
@@ -40,4 +42,33 @@ datatype_dict_num_str = {
     gdal.GDT_UInt32: 'uint32'
 }
 
+datatype_dict_num_np = {
+    gdal.GDT_Byte: np.uint8,
+    gdal.GDT_CFloat32: np.complex64,
+    gdal.GDT_CFloat64: np.complex128,
+    gdal.GDT_CInt16: np.complex64,
+    gdal.GDT_CInt32: np.complex128,
+    gdal.GDT_Float32: np.float32,
+    gdal.GDT_Float64: np.float64,
+    gdal.GDT_Int16: np.int16,
+    gdal.GDT_Int32: np.int32,
+    gdal.GDT_UInt16: np.uint16,
+    gdal.GDT_UInt32: np.uint32
+}
 
+datatype_dict_np_str = {
+    'bool': 'byte',
+    'uint8': 'byte',
+    'int8': 'int16',
+    'uint16': 'uint16',
+    'int16': 'int16',
+    'uint32': 'uint32',
+    'int32': 'int32',
+    'uint64': 'float64',
+    'int64': 'float64',
+    'float16': 'float32',
+    'float32': 'float32',
+    'float64': 'float64',
+    'complex64': 'cfloat32',
+    'complex128': 'cfloat64'
+}